@@ -1,17 +1,41 @@
-from flask import Flask
+import os
+
+from flask import Flask, jsonify
 from app.extensions import db, migrate,bcrypt,jwt
+from app.hashing import HashingBusy
+from app.blocklist import blocklist, is_token_revoked
+from app.json_provider import FastJSONProvider
+from app.versioning import table_versions
+from app.response_cache import response_cache
+from app.compression import compression
+from app.instrumentation import sql_instrumentation
+from app.database import apply_mysql_connect_args, pool_telemetry
+from app.replicas import read_replicas
+from app.query_audit import explain_audit
+from app.reservations import stock_reservations, release_reservations
+from app.metrics import metrics, render_prometheus
+from app.auth import admin_required, login_required
+from app.batch import run_batch
+from app.statuscodes import HTTP_429_TOO_MANY_REQUESTS
 
 
-def create_app():
+def create_app(config_name=None):
 
      app =  Flask(__name__)
-     app.config.from_object('config.config')
+     # APP_ENV picks one of config.configs (development, production, testing, sqlite)
+     from config import configs
+     app.config.from_object(configs[config_name or os.environ.get('APP_ENV', 'default')])
+     app.json = FastJSONProvider(app)
 
 
+     read_replicas.init_app(app)
+     apply_mysql_connect_args(app)
      db.init_app(app)
      migrate.init_app(app, db)
      bcrypt.init_app(app)
      jwt.init_app(app)
+     jwt.token_in_blocklist_loader(is_token_revoked)
+     blocklist.init_app(app)
 
     #importing models
      from app.models import user
@@ -25,7 +49,15 @@ def create_app():
      from app.models import event
      from app.models import donation
      from app.models import contact
+     from app.models import reservation
 
+     table_versions.init_app(app)
+     response_cache.init_app(app)
+     compression.init_app(app)
+     sql_instrumentation.init_app(app)
+     pool_telemetry.init_app(app)
+     metrics.init_app(app)
+     stock_reservations.init_app(app)
      
 
      #registering blueprints
@@ -58,6 +90,37 @@ def create_app():
      def home():
          return "Website Api"
 
+     # response cache hit/miss/eviction counters
+     @app.route("/api/v1/cache/stats")
+     @admin_required()
+     def cache_stats():
+         return jsonify({"response_cache": response_cache.stats()})
+
+     # connection pool state per bind
+     @app.route("/api/v1/db/pool")
+     @admin_required()
+     def pool_status():
+         return jsonify({"pools": pool_telemetry.status()})
+
+     # Prometheus text format, summed over every worker process
+     @app.route("/metrics")
+     def metrics_endpoint():
+         return app.response_class(render_prometheus(*metrics.collect()), mimetype='text/plain; version=0.0.4')
+
+     # several API calls in one round trip, optionally in one transaction (app/batch.py)
+     @app.route("/api/v1/batch", methods=['POST'])
+     @login_required()
+     def batch():
+         return run_batch()
+
+     app.cli.add_command(explain_audit)
+     app.cli.add_command(release_reservations)
+
+     # password hashing pool is saturated
+     @app.errorhandler(HashingBusy)
+     def hashing_busy(e):
+         return jsonify({"error": "Too many requests, please try again shortly"}), HTTP_429_TOO_MANY_REQUESTS
+
 
      return app 
 
@@ -0,0 +1,100 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from app.extensions import db
+from app.statuscodes import HTTP_400_BAD_REQUEST
+from app.versioning import table_versions
+
+
+# Per-process cache of user id -> role so the admin checks don't hit `users` on every request.
+# A cached role of None means the user does not exist. Entries remember the shared `users`
+# table version they were loaded at, so a write to `users` in any worker process retires them.
+class UserRoleCache:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, user_id):
+        from app.models.user import User
+
+        row = db.session.query(User.user_type).filter(User.id == user_id).first()
+        return row[0] if row else None
+
+    def get(self, user_id):
+        now = time.monotonic()
+        # read before the query, so a write racing it leaves an entry that is already stale
+        version = table_versions.get('users')
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > now and entry[2] == version:
+            return entry[0]
+
+        role = self._load(user_id)
+        ttl = current_app.config.get('USER_CACHE_TTL', self.ttl)
+        with self._lock:
+            self._entries[user_id] = (role, now + ttl, version)
+        return role
+
+    def exists(self, user_id):
+        return self.get(user_id) is not None
+
+    # The commit that changed the user already bumped the shared version; this only frees the entry
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    # A role claim is current while `users` is unchanged since the token was issued
+    def claim_is_current(self, claims):
+        version = claims.get('users_version')
+        return version is not None and version == table_versions.get('users')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserRoleCache()
+
+
+# Claims added to every access token
+def role_claims(role):
+    return {"user_type": role, "users_version": table_versions.get('users')}
+
+
+# Resolve the role of the current token, preferring the claim over a lookup
+def current_user_role():
+    claims = get_jwt()
+    role = claims.get('user_type')
+    if role is not None and user_cache.claim_is_current(claims):
+        return role
+    return user_cache.get(get_jwt_identity())
+
+
+# Requires a valid token for an existing user
+def login_required(message="Access forbidden: Only logged-in users can access this resource"):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if current_user_role() is None:
+                return jsonify({"message": message}), HTTP_400_BAD_REQUEST
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Requires a valid token for a user whose role is admin
+def admin_required(message="Access forbidden: Only admins can access this resource"):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if current_user_role() != 'admin':
+                return jsonify({"message": message}), HTTP_400_BAD_REQUEST
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+from flask import current_app, jsonify, request
+from werkzeug.test import EnvironBuilder
+
+from app.extensions import db
+from app.metrics import metrics
+from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_424_FAILED_DEPENDENCY
+
+BATCH_PATH = '/api/v1/batch'
+BATCH_METHODS = frozenset(('GET', 'POST', 'PUT', 'PATCH', 'DELETE'))
+# headers of the batch request every sub-request inherits unless it sets its own
+INHERITED_HEADERS = ('Authorization', 'Cookie', 'User-Agent')
+
+
+def _error(message):
+    return jsonify({"error": message}), HTTP_400_BAD_REQUEST
+
+
+def _validate(payload, limit):
+    if not isinstance(payload, dict) or not isinstance(payload.get('requests'), list):
+        return 'Expected {"requests": [...]}'
+    subrequests = payload['requests']
+    if not subrequests:
+        return 'No requests given'
+    if len(subrequests) > limit:
+        return f'At most {limit} requests per batch'
+    for i, sub in enumerate(subrequests):
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str):
+            return f'Request {i} needs a path'
+        if not sub['path'].startswith('/api/v1/') or sub['path'].split('?', 1)[0].rstrip('/') == BATCH_PATH:
+            return f'Request {i}: path must be an /api/v1 route other than the batch endpoint'
+        if sub.get('method', 'GET').upper() not in BATCH_METHODS:
+            return f'Request {i}: unsupported method {sub.get("method")!r}'
+        if not isinstance(sub.get('headers', {}), dict):
+            return f'Request {i}: headers must be an object'
+    return None
+
+
+# Runs one sub-request through the normal URL map, view and error handlers, inside the
+# batch's app context, so it shares the batch's DB session. The app's before/after
+# request hooks (metrics, compression, replica routing) run once, for the batch itself.
+def _dispatch(app, sub):
+    headers = {name: request.headers[name] for name in INHERITED_HEADERS if name in request.headers}
+    headers.update(sub.get('headers') or {})
+    headers['Accept'] = 'application/json'
+    builder = EnvironBuilder(
+        path=sub['path'],
+        method=sub.get('method', 'GET').upper(),
+        headers=headers,
+        json=sub['body'] if 'body' in sub else None,
+        base_url=request.host_url
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with app.request_context(environ):
+        try:
+            rv = app.dispatch_request()
+        except Exception as e:
+            try:
+                rv = app.handle_user_exception(e)
+            except Exception:
+                app.logger.exception('Batch sub-request %s %s failed', environ['REQUEST_METHOD'], sub['path'])
+                rv = jsonify({"error": "Internal server error"}), 500
+        response = app.make_response(rv)
+        metrics.inc('recess_batch_subrequests_total', {
+            "endpoint": request.endpoint or "unmatched",
+            "method": request.method,
+            "status": str(response.status_code)
+        })
+        return response, response.get_data()
+
+
+def _encode(app, sub, status, body, mimetype):
+    item = app.json.dumps({"id": sub.get('id'), "status": status}).encode('utf-8')
+    if body is None:
+        return item
+    # JSON bodies are spliced in as they are instead of being decoded and encoded again
+    if mimetype != 'application/json':
+        body = app.json.dumps(body.decode('utf-8', 'replace')).encode('utf-8')
+    return item[:-1] + b',"body":' + (body.strip() or b'null') + b'}'
+
+
+# POST /api/v1/batch
+#
+#   {"transaction": false, "requests": [
+#       {"id": "squads", "method": "GET", "path": "/api/v1/squad/squads?limit=20"},
+#       {"method": "POST", "path": "/api/v1/contacts/create", "body": {...}, "headers": {...}}
+#   ]}
+#
+# Sub-requests run in order and inherit the batch's Authorization header. Without a
+# transaction each successful view commits its own work, and whatever a failed one
+# (status >= 400) left in the shared session is rolled back before the next one runs. With
+# "transaction": true the views' commits only flush and the batch commits once at the end;
+# the first sub-request that fails rolls everything back, and the requests after it are
+# answered with 424 without running.
+def run_batch():
+    app = current_app._get_current_object()
+    payload = request.get_json(silent=True)
+    problem = _validate(payload, app.config.get('BATCH_MAX_REQUESTS', 20))
+    if problem:
+        return _error(problem)
+    atomic = bool(payload.get('transaction'))
+
+    session = db.session
+    results = []
+    failed = False
+    if atomic:
+        session.info['deferred_commit'] = True
+    try:
+        for sub in payload['requests']:
+            if failed:
+                results.append((sub, HTTP_424_FAILED_DEPENDENCY, None, None))
+                continue
+            response, body = _dispatch(app, sub)
+            results.append((sub, response.status_code, body, response.mimetype))
+            if atomic:
+                failed = response.status_code >= 400 or session.info.get('rolled_back', False)
+            elif response.status_code >= 400:
+                # a view may return an error after changing objects without rolling back;
+                # the next sub-request's commit must not save those changes
+                session.rollback()
+    finally:
+        if atomic:
+            session.info.pop('deferred_commit', None)
+            session.info.pop('rolled_back', None)
+
+    committed = None
+    if atomic:
+        committed = False
+        if failed:
+            session.rollback()
+        else:
+            try:
+                session.commit()
+                committed = True
+            except Exception as e:
+                session.rollback()
+                app.logger.warning('Batch transaction failed to commit: %s', e)
+
+    items = b','.join(_encode(app, sub, status, body, mimetype) for sub, status, body, mimetype in results)
+    head = {"transaction": atomic}
+    if atomic:
+        head["committed"] = committed
+    body = app.json.dumps(head).encode('utf-8')[:-1] + b',"responses":[' + items + b']}'
+    status = HTTP_409_CONFLICT if atomic and not committed else 200
+    return app.response_class(body, status=status, mimetype='application/json')
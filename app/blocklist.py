@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+import time
+
+from app.sharedmem import SharedCounters
+
+
+# Fixed-size bloom filter, answers "definitely not present" without touching the entry table
+class BloomFilter:
+    def __init__(self, size_bits=1 << 16, hashes=4):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self._bits = bytearray(size_bits // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=self.hashes * 4).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4:i * 4 + 4], 'little') % self.size_bits
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# Revoked token ids, each kept only until the token itself would have expired.
+# Shared by every worker process on the host: revocations are appended to a log file as
+# "<exp> <jti>" lines, and a SharedCounters file holds the log's committed length (slot 0) and
+# a generation bumped whenever the log is compacted (slot 1). Each process keeps its own dict
+# and bloom filter, and a lookup reads just the lines appended since it last looked, so the
+# common case is two memory reads. Without init_app the blocklist is local to the process.
+class TokenBlocklist:
+    def __init__(self, purge_interval=60):
+        self.purge_interval = purge_interval
+        self.counters = None
+        self._fd = None
+        self._offset = 0
+        self._generation = 0
+        self._lines = 0
+        self._entries = {}
+        self._bloom = BloomFilter()
+        self._next_purge = time.time() + purge_interval
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        directory = app.config.get('TOKEN_BLOCKLIST_DIR') or app.instance_path
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            if self.counters is not None:
+                self.counters.close()
+                os.close(self._fd)
+            self.counters = SharedCounters(os.path.join(directory, 'token_blocklist.bin'), 2)
+            self._fd = os.open(os.path.join(directory, 'token_blocklist.log'), os.O_RDWR | os.O_CREAT, 0o600)
+            self._offset = self._generation = self._lines = 0
+            self._entries = {}
+            self._bloom = BloomFilter()
+        app.extensions['token_blocklist'] = self
+
+    def add(self, jti, expires_at):
+        if self.counters is None:
+            with self._lock:
+                self._entries[jti] = expires_at
+                self._bloom.add(jti)
+            return
+        line = f'{expires_at!r} {jti}\n'.encode('utf-8')
+        with self.counters.locked():
+            length = self.counters.get(0)
+            os.pwrite(self._fd, line, length)
+            # readers only look below the committed length, so a half-written line is never seen
+            self.counters.store(0, length + len(line))
+        self.sync()
+
+    def __contains__(self, jti):
+        now = time.time()
+        if now >= self._next_purge:
+            self.purge(now)
+        elif self.counters is not None:
+            self.sync()
+        if jti not in self._bloom:
+            return False
+        expires_at = self._entries.get(jti)
+        return expires_at is not None and expires_at > now
+
+    # Pick up revocations made by other processes
+    def sync(self):
+        counters = self.counters
+        if counters.get(0) == self._offset and counters.get(1) == self._generation:
+            return
+        with self._lock, counters.locked():
+            self._read_log()
+
+    # Caller holds both locks
+    def _read_log(self):
+        generation, length = self.counters.get(1), self.counters.get(0)
+        if generation != self._generation or length < self._offset:
+            # compacted by another process: start over from the new log
+            self._offset = self._lines = 0
+            self._generation = generation
+            entries, bloom = {}, BloomFilter()
+        else:
+            entries, bloom = self._entries, self._bloom
+        data = os.pread(self._fd, length - self._offset, self._offset) if length > self._offset else b''
+        for line in data.decode('utf-8').splitlines():
+            expires_at, jti = line.split(' ', 1)
+            entries[jti] = float(expires_at)
+            bloom.add(jti)
+            self._lines += 1
+        self._offset = length
+        self._entries, self._bloom = entries, bloom
+
+    # Drop expired entries and swap in a bloom filter rebuilt from what is left; lookups running
+    # meanwhile keep using the old filter, which still holds every live entry. When most of the
+    # shared log has expired it is rewritten with the live entries.
+    def purge(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            if self.counters is None:
+                self._rebuild(now)
+            else:
+                with self.counters.locked():
+                    self._read_log()
+                    self._rebuild(now)
+                    if self._lines > 2 * len(self._entries) + 100:
+                        self._compact()
+            self._next_purge = now + self.purge_interval
+
+    def _rebuild(self, now):
+        entries = {jti: exp for jti, exp in self._entries.items() if exp > now}
+        bloom = BloomFilter()
+        for jti in entries:
+            bloom.add(jti)
+        self._entries, self._bloom = entries, bloom
+
+    def _compact(self):
+        data = ''.join(f'{exp!r} {jti}\n' for jti, exp in self._entries.items()).encode('utf-8')
+        os.pwrite(self._fd, data, 0)
+        os.ftruncate(self._fd, len(data))
+        generation = self.counters.get(1) + 1
+        self.counters.store(0, len(data))
+        self.counters.store(1, generation)
+        self._offset, self._generation, self._lines = len(data), generation, len(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+blocklist = TokenBlocklist()
+
+
+def revoke_token(jwt_payload):
+    # tokens without an expiry stay revoked until the blocklist files are removed
+    blocklist.add(jwt_payload['jti'], jwt_payload.get('exp') or float('inf'))
+
+
+# flask_jwt_extended token_in_blocklist_loader
+def is_token_revoked(jwt_header, jwt_payload):
+    return jwt_payload['jti'] in blocklist
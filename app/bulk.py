@@ -0,0 +1,168 @@
+from flask import current_app, jsonify, request
+from sqlalchemy import String, tuple_
+
+from app.extensions import db
+from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED
+
+# keys looked up per query; 4 key columns x 2500 stays under SQLite's bound parameter limit
+# and a full BULK_MAX_ROWS upload takes no more than 4 lookups
+KEY_CHUNK = 2500
+
+
+# Raised by a row validator; the message is reported against the row's index
+class RowError(ValueError):
+    pass
+
+
+def required(data, *fields):
+    missing = [field for field in fields if data.get(field) in (None, '')]
+    if missing:
+        raise RowError(f"Missing required field(s): {', '.join(missing)}")
+
+
+def to_int(data, field, default=None):
+    value = data.get(field, default)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid {field} format (must be an integer)")
+
+
+def to_float(data, field, optional=False):
+    value = data.get(field)
+    if optional and value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid {field} format (must be a number)")
+
+
+# String columns are checked against their declared length, which MySQL would otherwise
+# reject (or truncate) for the whole statement
+def _check_lengths(model, row):
+    for column in model.__table__.columns:
+        value = row.get(column.key)
+        if isinstance(column.type, String) and column.type.length and isinstance(value, str) \
+                and len(value) > column.type.length:
+            raise RowError(f"{column.key} is longer than {column.type.length} characters")
+
+
+def _chunks(values, size=KEY_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# key tuple -> ids of the existing rows having it
+def _existing_keys(model, key, wanted):
+    columns = [getattr(model, name) for name in key]
+    found = {}
+    for chunk in _chunks(wanted):
+        if len(columns) == 1:
+            condition = columns[0].in_([k[0] for k in chunk])
+        else:
+            # the IN on the leading column lets the planner use an index on the key, SQLite
+            # won't for a row-value IN (VALUES ...) alone
+            condition = db.and_(columns[0].in_({k[0] for k in chunk}), tuple_(*columns).in_(chunk))
+        for row in db.session.execute(db.select(model.id, *columns).where(condition)):
+            found.setdefault(tuple(row[1:]), []).append(row[0])
+    return found
+
+
+def _existing_ids(model, ids):
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(db.session.execute(db.select(model.id).where(model.id.in_(chunk))).scalars())
+    return found
+
+
+# Bulk create (or upsert) endpoint body shared by the resources that are loaded in bulk.
+#
+#   [{...}, {...}]  or  {"items": [{...}], "mode": "insert" | "upsert", "partial": false}
+#
+# Every row is validated first by `validate_row(data) -> mapping of column values`, which
+# raises RowError. `references` maps a column to the model it points at; the referenced
+# ids are checked with one query. `key` names the columns identifying a row: upsert
+# updates the existing row with that key, and insert rejects existing keys when `unique`.
+# Unless "partial" is set, any invalid row means nothing is written. The valid rows are
+# written with executemany INSERT / UPDATE statements in a single transaction.
+def bulk_load(model, validate_row, key=None, unique=False, references=None):
+    payload = request.get_json(silent=True)
+    if isinstance(payload, list):
+        payload = {"items": payload}
+    if not isinstance(payload, dict) or not isinstance(payload.get('items'), list) or not payload['items']:
+        return jsonify({"message": 'Expected a non-empty JSON array of rows or {"items": [...]}'}), HTTP_400_BAD_REQUEST
+    items = payload['items']
+    mode = payload.get('mode', 'insert')
+    partial = bool(payload.get('partial'))
+    limit = current_app.config.get('BULK_MAX_ROWS', 10000)
+    if len(items) > limit:
+        return jsonify({"message": f"At most {limit} rows per request"}), HTTP_400_BAD_REQUEST
+    if mode not in ('insert', 'upsert'):
+        return jsonify({"message": "mode must be insert or upsert"}), HTTP_400_BAD_REQUEST
+    if mode == 'upsert' and key is None:
+        return jsonify({"message": "Upsert is not supported for this resource"}), HTTP_400_BAD_REQUEST
+
+    rows = []
+    errors = []
+    seen = {}
+    for i, data in enumerate(items):
+        try:
+            if not isinstance(data, dict):
+                raise RowError("Row must be an object")
+            row = validate_row(data)
+            _check_lengths(model, row)
+        except RowError as e:
+            errors.append({"index": i, "error": str(e)})
+            continue
+        if key is not None:
+            row_key = tuple(row[name] for name in key)
+            if row_key in seen:
+                errors.append({"index": i, "error": f"Same {'/'.join(key)} as row {seen[row_key]}"})
+                continue
+            seen[row_key] = i
+        rows.append((i, row))
+
+    for column, target in (references or {}).items():
+        found = _existing_ids(target, {row[column] for _, row in rows})
+        missing = [(i, row) for i, row in rows if row[column] not in found]
+        errors.extend({"index": i, "error": f"{column} {row[column]} does not exist"} for i, row in missing)
+        rows = [(i, row) for i, row in rows if row[column] in found]
+
+    existing = {}
+    if key is not None and (mode == 'upsert' or unique):
+        existing = _existing_keys(model, key, [tuple(row[name] for name in key) for _, row in rows])
+    inserts = []
+    updates = []
+    for i, row in rows:
+        ids = existing.get(tuple(row[name] for name in key)) if existing else None
+        if not ids:
+            inserts.append(row)
+        elif mode == 'insert':
+            errors.append({"index": i, "error": f"A row with this {'/'.join(key)} already exists"})
+        elif len(ids) > 1:
+            errors.append({"index": i, "error": f"{'/'.join(key)} matches {len(ids)} existing rows"})
+        else:
+            updates.append(dict(row, id=ids[0]))
+    errors.sort(key=lambda error: error['index'])
+
+    if errors and not partial:
+        return jsonify({"message": "No rows were written, fix the errors or send partial=true", "errors": errors}), HTTP_400_BAD_REQUEST
+
+    try:
+        if inserts:
+            db.session.execute(db.insert(model), inserts)
+        if updates:
+            db.session.execute(db.update(model), updates)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "An error occurred while writing the rows", "details": str(e)}), HTTP_400_BAD_REQUEST
+
+    return jsonify({
+        "message": f"{len(inserts) + len(updates)} row(s) written",
+        "created": len(inserts),
+        "updated": len(updates),
+        "errors": errors
+    }), HTTP_201_CREATED
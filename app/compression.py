@@ -0,0 +1,77 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/msgpack', 'application/x-msgpack',
+                          'text/plain', 'text/html', 'text/csv')
+
+
+# gzip/brotli response compression negotiated from Accept-Encoding. Bodies under
+# COMPRESS_MIN_SIZE are sent as they are. When the response came from the response cache
+# (or was just stored in it) the compressed bytes are kept on the cache entry next to the
+# plain body, so a repeated request for the same payload is not compressed again.
+class Compression:
+    def __init__(self):
+        self.enabled = False
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.encodings = ('gzip',)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+        # brotli is preferred when the client accepts both and the package is installed
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        if self.enabled:
+            app.after_request(self._compress_response)
+        app.extensions['compression'] = self
+
+    def negotiate(self):
+        return request.accept_encodings.best_match(self.encodings)
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        # mtime=0 keeps the output identical for identical bodies, so ETags stay meaningful
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_response(self, response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+            or response.status_code in (204, 206, 304)
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        cached = getattr(response, 'cache_entry', None)
+        compressed = cached[1].encoded.get(encoding) if cached is not None else None
+        if compressed is None:
+            compressed = self.compress(data, encoding)
+            if cached is not None:
+                from app.response_cache import response_cache
+                response_cache.add_encoding(cached[0], cached[1], encoding, compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+compression = Compression()
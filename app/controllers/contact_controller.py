@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
-from app.models.contact import Contact
+from app.models.contact import Contact, contact_serializer
 from app.extensions import db
-import validators
+from app.pagination import paginate
+from app.streaming import stream_rows, wants_stream
+from app.response_cache import cached
+from app.lazy import lazy_import
+
+validators = lazy_import('validators')
 
 contact_bp = Blueprint('contact_bp', __name__, url_prefix='/api/v1/contacts')
 
@@ -34,14 +39,7 @@ def create_contact():
 
     return jsonify({
         "message": "Contact created successfully",
-        "contact": {
-            "id": new_contact.id,
-            "name": new_contact.name,
-            "email": new_contact.email,
-            "message": new_contact.message,
-            "date": new_contact.date.strftime("%Y-%m-%d %H:%M:%S"),
-            "user_id": new_contact.user_id
-        }
+        "contact": contact_serializer.dump(new_contact)
     }), HTTP_200_OK
 
 # update contact
@@ -68,13 +66,7 @@ def update_contact(id):
 
         return jsonify({
             "message": "Contact updated successfully",
-            "contact": {
-                "id": contact.id,
-                "name": contact.name,
-                "email": contact.email,
-                "message": contact.message,
-                "date": contact.date.strftime("%Y-%m-%d %H:%M:%S")
-            }
+            "contact": contact_serializer.dump(contact)
         }), HTTP_200_OK
 
     except Exception as e:
@@ -101,23 +93,16 @@ def delete_contact(id):
 
 # get all contact
 @contact_bp.route('/', methods=['GET'])
+@cached('contacts')
 def get_all_contacts():
     try:
-        contacts = Contact.query.all()
-
-        contacts_data = []
+        # Full-table export, streamed row by row
+        if wants_stream():
+            return stream_rows(Contact, contact_serializer, "contacts")
 
-        for contact in contacts:
-            contact_info = {
-                "id": contact.id,
-                "name": contact.name,
-                "email": contact.email,
-                "message": contact.message,
-                "date": contact.date.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            contacts_data.append(contact_info)
+        contacts_data, next_cursor = paginate(Contact, contact_serializer)
 
-        return jsonify({"contacts": contacts_data}), HTTP_200_OK
+        return jsonify({"contacts": contacts_data, "next": next_cursor}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving contacts", "details": str(e)}), HTTP_400_BAD_REQUEST
@@ -125,6 +110,7 @@ def get_all_contacts():
 
 #get a contact
 @contact_bp.route('/<int:id>', methods=['GET'])
+@cached('contacts')
 def get_contact(id):
     try:
         contact = Contact.query.get(id)
@@ -132,13 +118,7 @@ def get_contact(id):
             return jsonify({"error": "Contact not found"}), HTTP_404_NOT_FOUND
 
         return jsonify({
-            "contact": {
-                "id": contact.id,
-                "name": contact.name,
-                "email": contact.email,
-                "message": contact.message,
-                "date": contact.date.strftime("%Y-%m-%d %H:%M:%S")
-            }
+            "contact": contact_serializer.dump(contact)
         }), HTTP_200_OK
 
     except Exception as e:
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
 from app.models.user import User
-from app.models.donation import Donation
+from app.models.donation import Donation, donation_serializer
 from app.extensions import db
+from app.pagination import paginate
+from app.streaming import stream_rows, wants_stream
+from app.versioning import etag_for
+from app.response_cache import cached
 from datetime import datetime
 
 donation_bp = Blueprint('donation_bp', __name__, url_prefix='/api/v1/donation')
@@ -36,15 +40,7 @@ def create_donation():
 
         return jsonify({
             "message": "Donation created successfully",
-            "donation": {
-                "id": new_donation.id,
-                "amount": new_donation.amount,
-                "message": new_donation.message,
-                "date": new_donation.donation_date.strftime("%Y-%m-%d"),
-                "user_id": new_donation.user_id,
-                "name": new_donation.name,
-                "contact": new_donation.contact
-            }
+            "donation": donation_serializer.dump(new_donation)
         }), HTTP_201_CREATED
 
     except Exception as e:
@@ -78,15 +74,7 @@ def update_donation(id):
 
         return jsonify({
             "message": "Donation updated successfully",
-            "donation": {
-                "id": donation.id,
-                "amount": donation.amount,
-                "message": donation.message,  # Include 'message' in response
-                "date": donation.donation_date.strftime("%Y-%m-%d"),
-                "user_id": donation.user_id,
-                "name": donation.name,
-                "contact": donation.contact
-            }
+            "donation": donation_serializer.dump(donation)
         }), HTTP_200_OK
 
     except Exception as e:
@@ -112,23 +100,17 @@ def delete_donation(id):
 
 # Get all donations (without JWT authentication)
 @donation_bp.route('/', methods=['GET'])
+@etag_for('donations')
+@cached('donations')
 def get_all_donations():
     try:
-        donations = Donation.query.all()
-
-        donations_data = []
-        for donation in donations:
-            donations_data.append({
-                "id": donation.id,
-                "amount": donation.amount,
-                "message": donation.message,  # Include 'message' in response
-                "date": donation.donation_date.strftime("%Y-%m-%d"),
-                "user_id": donation.user_id,
-                "name": donation.name,
-                "contact": donation.contact
-            })
-
-        return jsonify({"donations": donations_data}), HTTP_200_OK
+        # Full-table export, streamed row by row
+        if wants_stream():
+            return stream_rows(Donation, donation_serializer, "donations")
+
+        donations_data, next_cursor = paginate(Donation, donation_serializer)
+
+        return jsonify({"donations": donations_data, "next": next_cursor}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving donations", "details": str(e)}), HTTP_400_BAD_REQUEST
@@ -1,23 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
 from app.models.event import Event
-from app.models.user import User
 from app.extensions import db
+from app.auth import admin_required
 from datetime import datetime
 
 event_bp = Blueprint('event_bp', __name__, url_prefix='/api/v1/event')
 
 # Create an event
 @event_bp.route('/create', methods=['POST'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can create events")
 def create_event():
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can create events"}), HTTP_400_BAD_REQUEST
 
     name = data.get('name')
     description = data.get('description')
@@ -50,14 +44,9 @@ def create_event():
 
 # Update an event
 @event_bp.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can update events")
 def update_event(id):
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can update events"}), HTTP_400_BAD_REQUEST
 
     event = Event.query.get(id)
     if not event:
@@ -93,14 +82,8 @@ def update_event(id):
 
 # Delete an event
 @event_bp.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can delete events")
 def delete_event(id):
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can delete events"}), HTTP_400_BAD_REQUEST
-
     event = Event.query.get(id)
     if not event:
         return jsonify({"message": "Event not found"}), HTTP_404_NOT_FOUND
@@ -1,23 +1,21 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
-from app.models.merchandise import Merchandise
-from app.models.user import User
+from app.models.merchandise import Merchandise, merchandise_serializer
 from app.extensions import db
+from app.auth import admin_required
+from app.pagination import paginate
+from app.versioning import etag_for
+from app.response_cache import cached
+from app.bulk import RowError, bulk_load, required, to_float, to_int
 
 merchandise_bp = Blueprint('merchandise_bp', __name__, url_prefix='/api/v1/merchandise')
 
 # Create merchandise
 @merchandise_bp.route('/create', methods=['POST'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can create merchandise")
 def create_merchandise():
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    # Check if user is logged in as admin
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can create merchandise"}), HTTP_400_BAD_REQUEST
 
     # Extract data and perform basic validation
     name = data.get('name')
@@ -59,26 +57,39 @@ def create_merchandise():
 
     return jsonify({"message": "Merchandise created successfully"}), HTTP_201_CREATED
 
+def merchandise_row(data):
+    required(data, 'name', 'description', 'price', 'stock', 'image', 'category')
+    price = to_float(data, 'price')
+    stock = to_int(data, 'stock')
+    if price < 0 or stock < 0:
+        raise RowError("price and stock can't be negative")
+    return {
+        "name": data['name'],
+        "description": data['description'],
+        "price": price,
+        "stock": stock,
+        "image": data['image'],
+        "category": data['category']
+    }
+
+# Create or upsert many merchandise items, upsert matches on name and category
+@merchandise_bp.route('/bulk', methods=['POST'])
+@admin_required("Access forbidden: Only admins can create merchandise")
+def bulk_create_merchandise():
+    return bulk_load(Merchandise, merchandise_row, key=('name', 'category'))
+
 # Get a merchandise item
 @merchandise_bp.route('/merchandise/<int:id>', methods=['GET'])
 @jwt_required()
+@etag_for('merchandises')
+@cached('merchandises')
 def get_merchandise(id):
     try:
         merchandise = Merchandise.query.get(id)
         if not merchandise:
             return jsonify({"error": "Merchandise not found"}), HTTP_404_NOT_FOUND
 
-        return jsonify({
-            "merchandise": {
-                "id": merchandise.id,
-                "name": merchandise.name,
-                "description": merchandise.description,
-                "price": merchandise.price,
-                "stock": merchandise.stock,
-                "image": merchandise.image,
-                "category": merchandise.category
-            }
-        }), HTTP_200_OK
+        return jsonify({"merchandise": merchandise_serializer.dump(merchandise)}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving the merchandise", "details": str(e)}), HTTP_400_BAD_REQUEST
@@ -86,35 +97,22 @@ def get_merchandise(id):
 # Get all merchandise items
 @merchandise_bp.route('/merchandise', methods=['GET'])
 @jwt_required()
+@etag_for('merchandises')
+@cached('merchandises')
 def get_all_merchandise():
     try:
-        merchandises = Merchandise.query.all()
-        merchandise_list = [{
-            "id": merchandise.id,
-            "name": merchandise.name,
-            "description": merchandise.description,
-            "price": merchandise.price,
-            "stock": merchandise.stock,
-            "image": merchandise.image,
-            "category": merchandise.category
-        } for merchandise in merchandises]
-
-        return jsonify({"merchandises": merchandise_list}), HTTP_200_OK
+        merchandise_list, next_cursor = paginate(Merchandise, merchandise_serializer)
+
+        return jsonify({"merchandises": merchandise_list, "next": next_cursor}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving the merchandise", "details": str(e)}), HTTP_400_BAD_REQUEST
 
 # Update a merchandise item
 @merchandise_bp.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can update merchandise")
 def update_merchandise(id):
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    # Check if user is logged in as admin
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can update merchandise"}), HTTP_400_BAD_REQUEST
 
     # Retrieve the merchandise by ID
     merchandise = Merchandise.query.get(id)
@@ -160,14 +158,8 @@ def update_merchandise(id):
 
 # Delete a merchandise item
 @merchandise_bp.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can delete merchandise")
 def delete_merchandise(id):
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can delete merchandise"}), HTTP_400_BAD_REQUEST
-
     merchandise = Merchandise.query.get(id)
     if not merchandise:
         return jsonify({"message": "Merchandise not found"}), HTTP_404_NOT_FOUND
@@ -1,32 +1,35 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
-from app.models.order import Order
-from app.models.user import User
+from datetime import datetime, timedelta
+from operator import attrgetter
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.orm import selectinload
+from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK, HTTP_409_CONFLICT
+from app.models.order import Order, order_serializer
+from app.models.orderitem import OrderItem, order_item_serializer
+from app.models.merchandise import Merchandise, merchandise_serializer
 from app.extensions import db
+from app.auth import admin_required, current_user_role, login_required
+from app.pagination import PaginationError, int_arg, limit_arg
+from app.reservations import stock_reservations, CONFIRMED_STATUSES, PENDING_STATUS, CANCELLED_STATUS, ORDER_TRANSITIONS
 
 order_bp = Blueprint('order_bp', __name__, url_prefix='/api/v1/orders')
 
 # Create an order
 @order_bp.route('/create', methods=['POST'])
-@jwt_required()
+@login_required("Access forbidden: Only logged-in users can create orders")
 def create_order():
     data = request.json
     user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
 
-    if not current_user:
-        return jsonify({"message": "Access forbidden: Only logged-in users can create orders"}), HTTP_400_BAD_REQUEST
-
-    status_of_order = data.get('status_of_order')
     address_of_delivery = data.get('address_of_delivery')
 
-    if not status_of_order or not address_of_delivery:
-        return jsonify({"message": "All fields (status_of_order, address_of_delivery) are required"}), HTTP_400_BAD_REQUEST
+    if not address_of_delivery:
+        return jsonify({"message": "address_of_delivery is required"}), HTTP_400_BAD_REQUEST
 
+    # every order starts Pending; it moves on through ORDER_TRANSITIONS on /edit
     new_order = Order(
         user_id=user_id,
-        status_of_order=status_of_order,
+        status_of_order=PENDING_STATUS,
         address_of_delivery=address_of_delivery
     )
 
@@ -39,16 +42,181 @@ def create_order():
 
     return jsonify({"message": "Order created successfully"}), HTTP_201_CREATED
 
+# Cart lines as {merchandise_id: quantity}, the same item listed twice is merged
+def cart_quantities(items, limit):
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list of {merchandise_id, quantity}")
+    if len(items) > limit:
+        raise ValueError(f"At most {limit} items per order")
+    quantities = {}
+    for line in items:
+        try:
+            merchandise_id = int(line['merchandise_id'])
+            quantity = int(line.get('quantity', 1))
+        except (TypeError, KeyError, ValueError):
+            raise ValueError("Each item needs an integer merchandise_id and quantity")
+        if quantity < 1:
+            raise ValueError("quantity must be at least 1")
+        quantities[merchandise_id] = quantities.get(merchandise_id, 0) + quantity
+    return quantities
+
+# Takes the cart's stock, or returns the ids that are short. Stock held by carts that were
+# never paid for may be what's missing, so those are released before giving up.
+def reserve_cart(quantities):
+    short = stock_reservations.reserve(quantities)
+    # the sweep commits, so this must run before the caller has written anything (checkout reserves first);
+    # a transactional batch can't commit the sweep on its own
+    if short and not db.session.info.get('deferred_commit'):
+        if stock_reservations.release_expired(short):
+            short = stock_reservations.reserve(quantities)
+    return short
+
+# Place a whole cart: the order and all its items in one transaction, priced from the catalogue
+@order_bp.route('/checkout', methods=['POST'])
+@login_required("Access forbidden: Only logged-in users can create orders")
+def checkout():
+    data = request.get_json(silent=True) or {}
+    user_id = get_jwt_identity()
+
+    address_of_delivery = data.get('address_of_delivery')
+    if not address_of_delivery:
+        return jsonify({"message": "address_of_delivery is required"}), HTTP_400_BAD_REQUEST
+    try:
+        quantities = cart_quantities(data.get('items'), current_app.config.get('CHECKOUT_MAX_ITEMS', 100))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), HTTP_400_BAD_REQUEST
+
+    # every price in one query; the client's prices are never used
+    prices = dict(db.session.execute(
+        db.select(Merchandise.id, Merchandise.price).where(Merchandise.id.in_(quantities))
+    ).all())
+    missing = sorted(set(quantities) - set(prices))
+    if missing:
+        return jsonify({"message": "Merchandise not found", "merchandise_ids": missing}), HTTP_404_NOT_FOUND
+
+    try:
+        short = reserve_cart(quantities)
+        if short:
+            return jsonify({"message": "Not enough stock", "merchandise_ids": short}), HTTP_409_CONFLICT
+        items = [{
+            "merchandise_id": merchandise_id,
+            "quantity": quantity,
+            "price_of_item": prices[merchandise_id],
+            "total_amount": round(quantity * prices[merchandise_id], 2)
+        } for merchandise_id, quantity in quantities.items()]
+        order = Order(user_id=user_id, status_of_order=PENDING_STATUS, address_of_delivery=address_of_delivery)
+        # totals known up front go in with the order's INSERT
+        order.order_total = round(sum(item['total_amount'] for item in items), 2)
+        order.item_count = sum(item['quantity'] for item in items)
+        db.session.add(order)
+        db.session.flush()
+        for item in items:
+            item['order_id'] = order.id
+        db.session.execute(db.insert(OrderItem), items)
+        stock_reservations.record(order.id, quantities)
+        # built before the commit expires the order
+        placed = {
+            "id": order.id,
+            "order_date": order.order_date.strftime("%Y-%m-%d %H:%M:%S"),
+            "status_of_order": order.status_of_order,
+            "address_of_delivery": order.address_of_delivery,
+            "items": [{key: item[key] for key in ('merchandise_id', 'quantity', 'price_of_item', 'total_amount')}
+                      for item in items],
+            "item_count": order.item_count,
+            "order_total": order.order_total
+        }
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "An error occurred while placing the order", "details": str(e)}), HTTP_400_BAD_REQUEST
+
+    return jsonify({"message": "Order placed successfully", "order": placed}), HTTP_201_CREATED
+
+# ?after= cursor of the order history, the "<order_date>,<id>" of the last order on the previous page
+def history_cursor(order):
+    return f"{order.order_date.isoformat()},{order.id}"
+
+def parse_history_cursor(value):
+    try:
+        order_date, order_id = value.rsplit(',', 1)
+        return datetime.fromisoformat(order_date), int(order_id)
+    except ValueError:
+        raise PaginationError("Invalid after cursor")
+
+# ?from= / ?to= as YYYY-MM-DD or a full datetime, with whether it was a bare date
+def date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None, False
+    try:
+        return datetime.fromisoformat(value), len(value) == 10
+    except ValueError:
+        raise PaginationError(f"Invalid {name} (must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)")
+
+HISTORY_ITEM_KEYS = ('id', 'merchandise_id', 'quantity', 'price_of_item', 'total_amount')
+HISTORY_MERCHANDISE_KEYS = ('id', 'name', 'price', 'image', 'category')
+
+def dump_order_history(order):
+    data = order_serializer.dump(order)
+    data["items"] = items = []
+    for item in sorted(order.order_items, key=attrgetter('id')):
+        item_data = order_item_serializer.dump(item, HISTORY_ITEM_KEYS)
+        merchandise = item.merchandise
+        item_data["merchandise"] = merchandise_serializer.dump(merchandise, HISTORY_MERCHANDISE_KEYS) if merchandise else None
+        items.append(item_data)
+    return data
+
+# Order history, newest first: the caller's orders, or every user's for admins (?user_id= picks one).
+# Keyset pagination on (order_date, id) with ?after=<next>&limit=N, filters ?status=a,b&from=&to=.
+# The items and their merchandise are loaded with one query each, whatever the page size.
+@order_bp.route('/history', methods=['GET'])
+@login_required("Access forbidden: Only logged-in users can view orders")
+def get_order_history():
+    user_id = get_jwt_identity()
+    try:
+        limit = limit_arg()
+        requested_user = int_arg('user_id')
+        if current_user_role() != 'admin':
+            if requested_user not in (None, user_id):
+                return jsonify({"message": "Access forbidden: You can only view your own orders"}), HTTP_400_BAD_REQUEST
+            requested_user = user_id
+
+        query = Order.query.options(selectinload(Order.order_items).selectinload(OrderItem.merchandise))
+        if requested_user is not None:
+            query = query.filter(Order.user_id == requested_user)
+        statuses = [status.strip() for status in request.args.get('status', '').split(',') if status.strip()]
+        if statuses:
+            query = query.filter(Order.status_of_order.in_(statuses))
+        start, _ = date_arg('from')
+        if start is not None:
+            query = query.filter(Order.order_date >= start)
+        end, whole_day = date_arg('to')
+        if end is not None:
+            query = query.filter(Order.order_date < end + timedelta(days=1) if whole_day else Order.order_date <= end)
+        after = request.args.get('after')
+        if after:
+            after_date, after_id = parse_history_cursor(after)
+            # spelled out rather than a row-value comparison, which MySQL can't use as an index range
+            query = query.filter(db.or_(Order.order_date < after_date,
+                                        db.and_(Order.order_date == after_date, Order.id < after_id)))
+
+        orders = query.order_by(Order.order_date.desc(), Order.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = history_cursor(orders[-1])
+
+        return jsonify({"orders": [dump_order_history(order) for order in orders], "next": next_cursor}), HTTP_200_OK
+
+    except Exception as e:
+        return jsonify({"error": "An error occurred while retrieving orders", "details": str(e)}), HTTP_400_BAD_REQUEST
+
 # Update an order
 @order_bp.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@login_required("Access forbidden: Only logged-in users can update orders")
 def update_order(id):
     data = request.json
     user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user:
-        return jsonify({"message": "Access forbidden: Only logged-in users can update orders"}), HTTP_400_BAD_REQUEST
 
     order = Order.query.get(id)
     if not order:
@@ -60,10 +228,34 @@ def update_order(id):
     status_of_order = data.get('status_of_order', order.status_of_order)
     address_of_delivery = data.get('address_of_delivery', order.address_of_delivery)
 
-    order.status_of_order = status_of_order
-    order.address_of_delivery = address_of_delivery
+    current_status = order.status_of_order
+    # the same transitions as the bulk endpoint; a Cancelled or Expired order's stock went back on sale
+    if status_of_order != current_status and status_of_order not in ORDER_TRANSITIONS.get(current_status, ()):
+        return jsonify({"message": f"Orders can't go from {current_status!r} to {status_of_order!r}",
+                        "allowed": list(ORDER_TRANSITIONS.get(current_status, ()))}), HTTP_409_CONFLICT
 
     try:
+        order.address_of_delivery = address_of_delivery
+        if status_of_order != current_status:
+            # conditional, so a concurrent change (the expiry sweep) can't be overwritten
+            moved = db.session.execute(
+                db.update(Order).where(Order.id == order.id, Order.status_of_order == current_status)
+                .values(status_of_order=status_of_order).execution_options(synchronize_session=False)
+            ).rowcount
+            if not moved:
+                db.session.rollback()
+                return jsonify({"message": "The order was changed meanwhile, try again"}), HTTP_409_CONFLICT
+            if current_status not in CONFIRMED_STATUSES and status_of_order in CONFIRMED_STATUSES:
+                short = stock_reservations.confirm(order.id)
+                if short:
+                    db.session.rollback()
+                    return jsonify({"message": "Not enough stock", "merchandise_ids": short}), HTTP_409_CONFLICT
+            elif status_of_order == CANCELLED_STATUS:
+                # a confirmed order's reservations became sold stock, its items go back instead
+                if current_status in CONFIRMED_STATUSES:
+                    stock_reservations.restock_orders([order.id])
+                else:
+                    stock_reservations.release(order.id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -71,15 +263,96 @@ def update_order(id):
 
     return jsonify({"message": "Order updated successfully"}), HTTP_200_OK
 
+# Moves many orders from one status to another, e.g. {"ids": [...], "from": "Paid", "to": "Shipped"}.
+# Each chunk of ids is one UPDATE ... WHERE id IN (...) AND status_of_order = :from, committed on
+# its own. Returns the ids updated, the ids not found and the ones skipped with their current status.
+@order_bp.route('/bulk/status', methods=['POST'])
+@admin_required("Access forbidden: Only admins can change orders in bulk")
+def bulk_update_order_status():
+    data = request.get_json(silent=True) or {}
+    from_status = data.get('from')
+    to_status = data.get('to')
+    ids = data.get('ids')
+    max_ids = current_app.config.get('ORDER_STATUS_MAX_IDS', 50000)
+
+    if to_status not in ORDER_TRANSITIONS.get(from_status, ()):
+        return jsonify({"message": f"Orders can't go from {from_status!r} to {to_status!r}",
+                        "allowed": ORDER_TRANSITIONS}), HTTP_400_BAD_REQUEST
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"message": "ids must be a non-empty list of order ids"}), HTTP_400_BAD_REQUEST
+    if len(ids) > max_ids:
+        return jsonify({"message": f"At most {max_ids} ids per request"}), HTTP_400_BAD_REQUEST
+
+    ids = list(dict.fromkeys(ids))
+    chunk = current_app.config.get('ORDER_STATUS_CHUNK', 1000)
+    updated, not_found, skipped = [], [], []
+    for start in range(0, len(ids), chunk):
+        chunk_ids = ids[start:start + chunk]
+        short_of = {}
+        try:
+            current = dict(db.session.execute(
+                db.select(Order.id, Order.status_of_order).where(Order.id.in_(chunk_ids)).with_for_update()
+            ).all())
+            eligible = [i for i in chunk_ids if current.get(i) == from_status]
+            done = eligible
+            if eligible:
+                result = db.session.execute(
+                    db.update(Order).where(Order.id.in_(eligible), Order.status_of_order == from_status)
+                    .values(status_of_order=to_status).execution_options(synchronize_session=False)
+                )
+                if result.rowcount != len(eligible):
+                    # changed by someone else since the SELECT
+                    current.update(db.session.execute(
+                        db.select(Order.id, Order.status_of_order).where(Order.id.in_(eligible))
+                    ).all())
+                    done = [i for i in eligible if current.get(i) == to_status]
+                if from_status not in CONFIRMED_STATUSES and to_status in CONFIRMED_STATUSES:
+                    if done and stock_reservations.confirm_orders(done):
+                        # not enough stock for all of them: confirm one by one and put the rest back
+                        confirmed = []
+                        for i in done:
+                            short = stock_reservations.confirm_orders([i])
+                            if short:
+                                short_of[i] = short
+                            else:
+                                confirmed.append(i)
+                        if short_of:
+                            db.session.execute(
+                                db.update(Order).where(Order.id.in_(list(short_of)))
+                                .values(status_of_order=from_status).execution_options(synchronize_session=False)
+                            )
+                            current.update((i, from_status) for i in short_of)
+                        done = confirmed
+                elif to_status == CANCELLED_STATUS and done:
+                    if from_status in CONFIRMED_STATUSES:
+                        stock_reservations.restock_orders(done)
+                    else:
+                        stock_reservations.release_orders(done)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": "An error occurred while updating the orders", "details": str(e),
+                            "updated": updated}), HTTP_400_BAD_REQUEST
+
+        done_ids = set(done)
+        for i in chunk_ids:
+            if i in done_ids:
+                updated.append(i)
+            elif i not in current:
+                not_found.append(i)
+            elif i in short_of:
+                skipped.append({"id": i, "status_of_order": current[i], "merchandise_ids": short_of[i]})
+            else:
+                skipped.append({"id": i, "status_of_order": current[i]})
+
+    return jsonify({"message": f"{len(updated)} order(s) moved from {from_status} to {to_status}",
+                    "updated": updated, "not_found": not_found, "skipped": skipped}), HTTP_200_OK
+
 # Delete an order
 @order_bp.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@login_required("Access forbidden: Only logged-in users can delete orders")
 def delete_order(id):
     user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user:
-        return jsonify({"message": "Access forbidden: Only logged-in users can delete orders"}), HTTP_400_BAD_REQUEST
 
     order = Order.query.get(id)
     if not order:
@@ -89,6 +362,7 @@ def delete_order(id):
         return jsonify({"message": "Access forbidden: You can only delete your own orders"}), HTTP_400_BAD_REQUEST
 
     try:
+        stock_reservations.release(order.id)
         db.session.delete(order)
         db.session.commit()
     except Exception as e:
@@ -1,42 +1,60 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
+from flask_jwt_extended import get_jwt_identity
+from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK, HTTP_409_CONFLICT
 from app.models.orderitem import OrderItem
-from app.models.user import User
+from app.models.order import Order, add_to_order_totals
+from app.models.merchandise import Merchandise
 from app.extensions import db
+from app.auth import current_user_role, login_required
+from app.reservations import stock_reservations, PENDING_STATUS
 
 orderitem_bp = Blueprint('orderitem_bp', __name__, url_prefix='/api/v1/orderitem')
 
+# The item's order, locked until the request commits, or the error response. Only the order's
+# owner or an admin changes its items, and only while it is Pending: a paid order's stock is
+# already sold, and a Cancelled or Expired one's went back on sale.
+def pending_order(order_id):
+    order = db.session.execute(db.select(Order).where(Order.id == order_id).with_for_update()).scalar()
+    if not order:
+        return None, (jsonify({"message": "Order not found"}), HTTP_404_NOT_FOUND)
+    if order.user_id != get_jwt_identity() and current_user_role() != 'admin':
+        return None, (jsonify({"message": "Access forbidden: You can only change items of your own orders"}), HTTP_400_BAD_REQUEST)
+    if order.status_of_order != PENDING_STATUS:
+        return None, (jsonify({"message": f"Items of a {order.status_of_order} order can't be changed"}), HTTP_409_CONFLICT)
+    return order, None
+
 # Create an order item
 @orderitem_bp.route('/create', methods=['POST'])
-@jwt_required()
+@login_required("Access forbidden: Only logged-in users can create order items")
 def create_order_item():
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    # Check if user is logged in
-    if not current_user:
-        return jsonify({"message": "Access forbidden: Only logged-in users can create order items"}), HTTP_400_BAD_REQUEST
 
     # Extract data and perform basic validation
     order_id = data.get('order_id')
     merchandise_id = data.get('merchandise_id')
     quantity = data.get('quantity')
-    price_of_item = data.get('price_of_item')
 
-    if not order_id or not merchandise_id or not quantity or not price_of_item:
-        return jsonify({"message": "All fields (order_id, merchandise_id, quantity, price_of_item) are required"}), HTTP_400_BAD_REQUEST
+    if not order_id or not merchandise_id or not quantity:
+        return jsonify({"message": "All fields (order_id, merchandise_id, quantity) are required"}), HTTP_400_BAD_REQUEST
 
     try:
+        order_id = int(order_id)
         quantity = int(quantity)
+        merchandise_id = int(merchandise_id)
     except ValueError:
-        return jsonify({"message": "Invalid quantity format (must be an integer)"}), HTTP_400_BAD_REQUEST
+        return jsonify({"message": "Invalid order_id, quantity or merchandise_id format (must be an integer)"}), HTTP_400_BAD_REQUEST
 
-    try:
-        price_of_item = float(price_of_item)
-    except ValueError:
-        return jsonify({"message": "Invalid price_of_item format (must be a number)"}), HTTP_400_BAD_REQUEST
+    if quantity < 1:
+        return jsonify({"message": "quantity must be at least 1"}), HTTP_400_BAD_REQUEST
+
+    order, error = pending_order(order_id)
+    if error:
+        return error
+
+    # priced from the catalogue like checkout; the client's price is never used
+    price_of_item = db.session.execute(db.select(Merchandise.price).where(Merchandise.id == merchandise_id)).scalar()
+    if price_of_item is None:
+        return jsonify({"message": "Merchandise not found"}), HTTP_404_NOT_FOUND
 
     # Create new order item
     new_order_item = OrderItem(
@@ -47,7 +65,11 @@ def create_order_item():
     )
 
     try:
+        if stock_reservations.reserve({merchandise_id: quantity}):
+            return jsonify({"message": "Not enough stock", "merchandise_ids": [merchandise_id]}), HTTP_409_CONFLICT
+        stock_reservations.record(order_id, {merchandise_id: quantity})
         db.session.add(new_order_item)
+        add_to_order_totals(order_id, new_order_item.total_amount, quantity)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -57,41 +79,46 @@ def create_order_item():
 
 # Update an order item
 @orderitem_bp.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@login_required("Access forbidden: Only logged-in users can update order items")
 def update_order_item(id):
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    # Check if user is logged in
-    if not current_user:
-        return jsonify({"message": "Access forbidden: Only logged-in users can update order items"}), HTTP_400_BAD_REQUEST
 
     # Retrieve the order item by ID
     order_item = OrderItem.query.get(id)
     if not order_item:
         return jsonify({"message": "Order item not found"}), HTTP_404_NOT_FOUND
 
-    # Extract data and perform basic validation
+    # Extract data and perform basic validation; the item keeps the price it was added at
     quantity = data.get('quantity', order_item.quantity)
-    price_of_item = data.get('price_of_item', order_item.price_of_item)
 
     try:
         quantity = int(quantity)
     except ValueError:
         return jsonify({"message": "Invalid quantity format (must be an integer)"}), HTTP_400_BAD_REQUEST
 
-    try:
-        price_of_item = float(price_of_item)
-    except ValueError:
-        return jsonify({"message": "Invalid price_of_item format (must be a number)"}), HTTP_400_BAD_REQUEST
+    if quantity < 1:
+        return jsonify({"message": "quantity must be at least 1"}), HTTP_400_BAD_REQUEST
 
-    # Update the order item
-    order_item.quantity = quantity
-    order_item.price_of_item = price_of_item
-    order_item.total_amount = quantity * price_of_item
+    order, error = pending_order(order_item.order_id)
+    if error:
+        return error
 
     try:
+        # reserve or give back the difference
+        change = quantity - order_item.quantity
+        if change > 0:
+            if stock_reservations.reserve({order_item.merchandise_id: change}):
+                return jsonify({"message": "Not enough stock", "merchandise_ids": [order_item.merchandise_id]}), HTTP_409_CONFLICT
+            stock_reservations.record(order_item.order_id, {order_item.merchandise_id: change})
+        elif change < 0:
+            stock_reservations.release(order_item.order_id, order_item.merchandise_id, -change)
+
+        total_amount = round(quantity * order_item.price_of_item, 2)
+        add_to_order_totals(order_item.order_id, total_amount - order_item.total_amount, change)
+
+        # Update the order item
+        order_item.quantity = quantity
+        order_item.total_amount = total_amount
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -101,19 +128,19 @@ def update_order_item(id):
 
 # Delete an order item
 @orderitem_bp.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@login_required("Access forbidden: Only logged-in users can delete order items")
 def delete_order_item(id):
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user:
-        return jsonify({"message": "Access forbidden: Only logged-in users can delete order items"}), HTTP_400_BAD_REQUEST
-
     order_item = OrderItem.query.get(id)
     if not order_item:
         return jsonify({"message": "Order item not found"}), HTTP_404_NOT_FOUND
 
+    order, error = pending_order(order_item.order_id)
+    if error:
+        return error
+
     try:
+        stock_reservations.release(order_item.order_id, order_item.merchandise_id, order_item.quantity)
+        add_to_order_totals(order_item.order_id, -order_item.total_amount, -order_item.quantity)
         db.session.delete(order_item)
         db.session.commit()
     except Exception as e:
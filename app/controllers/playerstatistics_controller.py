@@ -1,23 +1,22 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
-from app.models.playerstatistics import PlayerStatistic
+from app.models.playerstatistics import PlayerStatistic, player_statistic_serializer
 from app.models.squad import Squad
-from app.models.user import User
 from app.extensions import db
+from app.auth import admin_required
+from app.pagination import paginate
+from app.versioning import etag_for
+from app.response_cache import cached
+from app.bulk import RowError, bulk_load, required, to_int
 
 playerstatistics_bp = Blueprint('playerstatistics_bp', __name__, url_prefix='/api/v1/playerstatistics')
 
 # Create player statistics
 @playerstatistics_bp.route('/create', methods=['POST'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can create player statistics")
 def create_player_statistic():
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can create player statistics"}), HTTP_400_BAD_REQUEST
 
     squad_id = data.get('squad_id')
     matches_played = data.get('matches_played')
@@ -49,9 +48,30 @@ def create_player_statistic():
         return jsonify({"message": "An error occurred while creating the player statistic", "details": str(e)}), HTTP_400_BAD_REQUEST
 
 
+STAT_FIELDS = ('tries_scored', 'conversions', 'penalties', 'yellow_cards', 'red_cards', 'minutes_played')
+
+
+def player_statistic_row(data):
+    required(data, 'squad_id', 'matches_played')
+    row = {"squad_id": to_int(data, 'squad_id'), "matches_played": to_int(data, 'matches_played')}
+    for field in STAT_FIELDS:
+        row[field] = to_int(data, field, 0)
+    if any(value < 0 for value in row.values()):
+        raise RowError("Statistics can't be negative")
+    return row
+
+# Create many player statistics (a stat sheet); squads can have several rows, so insert only
+@playerstatistics_bp.route('/bulk', methods=['POST'])
+@admin_required("Access forbidden: Only admins can create player statistics")
+def bulk_create_player_statistics():
+    return bulk_load(PlayerStatistic, player_statistic_row, references={"squad_id": Squad})
+
+
 # Get player statistic by squad ID
 @playerstatistics_bp.route('/squad/<int:squad_id>', methods=['GET'])
 @jwt_required()
+@etag_for('squads', 'playerstatistics')
+@cached('squads', 'playerstatistics')
 def get_player_statistics_by_squad(squad_id):
     try:
         squad = Squad.query.get(squad_id)
@@ -62,19 +82,7 @@ def get_player_statistics_by_squad(squad_id):
         if not statistics:
             return jsonify({"error": "No player statistics found for this squad"}), HTTP_404_NOT_FOUND
 
-        statistics_list = [
-            {
-                "id": stat.id,
-                "squad_id": stat.squad_id,
-                "matches_played": stat.matches_played,
-                "tries_scored": stat.tries_scored,
-                "conversions": stat.conversions,
-                "penalties": stat.penalties,
-                "yellow_cards": stat.yellow_cards,
-                "red_cards": stat.red_cards,
-                "minutes_played": stat.minutes_played
-            } for stat in statistics
-        ]
+        statistics_list = player_statistic_serializer.dump_many(statistics)
 
         return jsonify({"statistics": statistics_list}), HTTP_200_OK
     except Exception as e:
@@ -83,37 +91,21 @@ def get_player_statistics_by_squad(squad_id):
 # Get all player statistics by squad id 
 @playerstatistics_bp.route('/playerstatistics', methods=['GET'])
 @jwt_required()
+@etag_for('playerstatistics')
+@cached('playerstatistics')
 def get_all_player_statistics():
     try:
-        statistics = PlayerStatistic.query.all()
-        statistics_list = [
-            {
-                "id": statistic.id,
-                "squad_id": statistic.squad_id,
-                "matches_played": statistic.matches_played,
-                "tries_scored": statistic.tries_scored,
-                "conversions": statistic.conversions,
-                "penalties": statistic.penalties,
-                "yellow_cards": statistic.yellow_cards,
-                "red_cards": statistic.red_cards,
-                "minutes_played": statistic.minutes_played
-            } for statistic in statistics
-        ]
+        statistics_list, next_cursor = paginate(PlayerStatistic, player_statistic_serializer)
 
-        return jsonify({"statistics": statistics_list}), HTTP_200_OK
+        return jsonify({"statistics": statistics_list, "next": next_cursor}), HTTP_200_OK
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving the player statistics", "details": str(e)}), HTTP_400_BAD_REQUEST
 
 # Update player statistic by squad ID
 @playerstatistics_bp.route('/edit/squad/<int:squad_id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can update player statistics")
 def update_player_statistics_by_squad(squad_id):
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can update player statistics"}), HTTP_400_BAD_REQUEST
 
     squad = Squad.query.get(squad_id)
     if not squad:
@@ -135,21 +127,15 @@ def update_player_statistics_by_squad(squad_id):
 
     try:
         db.session.commit()
-        return jsonify({"message": "Player statistics updated successfully", "statistics": updated_stats}), HTTP_200_OK
+        return jsonify({"message": "Player statistics updated successfully", "statistics": player_statistic_serializer.dump_many(updated_stats)}), HTTP_200_OK
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": "An error occurred while updating the player statistics", "details": str(e)}), HTTP_400_BAD_REQUEST
 
 # Delete player statistics by squad ID
 @playerstatistics_bp.route('/delete/squad/<int:squad_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can delete player statistics")
 def delete_player_statistics_by_squad(squad_id):
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can delete player statistics"}), HTTP_400_BAD_REQUEST
-
     squad = Squad.query.get(squad_id)
     if not squad:
         return jsonify({"message": "Squad not found"}), HTTP_404_NOT_FOUND
@@ -1,24 +1,22 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_200_OK
-from app.models.squad import Squad
-from app.models.user import User
+from app.models.squad import Squad, squad_serializer
 from app.extensions import db
+from app.auth import admin_required
+from app.pagination import paginate
+from app.versioning import etag_for
+from app.response_cache import cached
+from app.bulk import RowError, bulk_load, required, to_float
 from datetime import datetime
 
 squad_bp = Blueprint('squad_bp', __name__, url_prefix='/api/v1/squad')
 
 # Create a squad
 @squad_bp.route('/create', methods=['POST'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can create squads")
 def create_squad():
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    # Check if user is logged in as admin
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can create squads"}), HTTP_400_BAD_REQUEST
 
     # Extract data and perform basic validation
     first_name = data.get('first_name')
@@ -69,9 +67,38 @@ def create_squad():
 
     return jsonify({"message": "Squad created successfully"}), HTTP_201_CREATED
 
+def squad_row(data):
+    required(data, 'first_name', 'last_name', 'position', 'jersey_number', 'biography', 'image')
+    date_of_birth = data.get('date_of_birth')
+    if date_of_birth:
+        try:
+            date_of_birth = datetime.strptime(date_of_birth, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise RowError("Invalid date_of_birth format (must be YYYY-MM-DD)")
+    return {
+        "first_name": data['first_name'],
+        "last_name": data['last_name'],
+        "position": data['position'],
+        # stored as a string, so 7 and "7" are the same jersey
+        "jersey_number": str(data['jersey_number']),
+        "biography": data['biography'],
+        "image": data['image'],
+        "weight": to_float(data, 'weight', optional=True),
+        "height": to_float(data, 'height', optional=True),
+        "date_of_birth": date_of_birth or None
+    }
+
+# Create or upsert many squad members, keyed on jersey_number
+@squad_bp.route('/bulk', methods=['POST'])
+@admin_required("Access forbidden: Only admins can create squads")
+def bulk_create_squads():
+    return bulk_load(Squad, squad_row, key=('jersey_number',), unique=True)
+
 # Get a squad
 @squad_bp.route('/squad/<int:id>', methods=['GET'])
 @jwt_required()
+@etag_for('squads')
+@cached('squads')
 def get_squad(id):
     try:
         # Retrieve the squad by ID
@@ -79,24 +106,8 @@ def get_squad(id):
         if not squad:
             return jsonify({"error": "Squad not found"}), HTTP_404_NOT_FOUND
 
-        # Ensure date_of_birth is converted to string only if it's a datetime object
-        date_of_birth_str = squad.date_of_birth.strftime("%Y-%m-%d") if isinstance(squad.date_of_birth, datetime) else squad.date_of_birth
-
         # Return squad details
-        return jsonify({
-            "squad": {
-                "id": squad.id,
-                "first_name": squad.first_name,
-                "last_name": squad.last_name,
-                "position": squad.position,
-                "jersey_number": squad.jersey_number,
-                "biography": squad.biography,
-                "image": squad.image,
-                "weight": squad.weight,
-                "height": squad.height,
-                "date_of_birth": date_of_birth_str
-            }
-        }), HTTP_200_OK
+        return jsonify({"squad": squad_serializer.dump(squad)}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving the squad", "details": str(e)}), HTTP_400_BAD_REQUEST
@@ -104,45 +115,24 @@ def get_squad(id):
 # Get all squads
 @squad_bp.route('/squads', methods=['GET'])
 @jwt_required()
+@etag_for('squads')
+@cached('squads')
 def get_all_squads():
     try:
-        # Retrieve all squads
-        squads = Squad.query.all()
-
-        # Convert each squad object to a dictionary for JSON response
-        squads_list = []
-        for squad in squads:
-            date_of_birth_str = squad.date_of_birth.strftime("%Y-%m-%d") if isinstance(squad.date_of_birth, datetime) else squad.date_of_birth
-            squads_list.append({
-                "id": squad.id,
-                "first_name": squad.first_name,
-                "last_name": squad.last_name,
-                "position": squad.position,
-                "jersey_number": squad.jersey_number,
-                "biography": squad.biography,
-                "image": squad.image,
-                "weight": squad.weight,
-                "height": squad.height,
-                "date_of_birth": date_of_birth_str
-            })
+        # Retrieve a page of squads
+        squads_list, next_cursor = paginate(Squad, squad_serializer)
 
         # Return the list of squads
-        return jsonify({"squads": squads_list}), HTTP_200_OK
+        return jsonify({"squads": squads_list, "next": next_cursor}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving the squads", "details": str(e)}), HTTP_400_BAD_REQUEST
 
 # Update a squad
 @squad_bp.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can update squads")
 def update_squad(id):
     data = request.json
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    # Check if user is logged in as admin
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can update squads"}), HTTP_400_BAD_REQUEST
 
     # Retrieve the squad by ID
     squad = Squad.query.get(id)
@@ -203,14 +193,8 @@ def update_squad(id):
 
 # Delete a squad
 @squad_bp.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required("Access forbidden: Only admins can delete squads")
 def delete_squad(id):
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
-
-    if not current_user or current_user.user_type != 'admin':
-        return jsonify({"message": "Access forbidden: Only admins can delete squads"}), HTTP_400_BAD_REQUEST
-
     squad = Squad.query.get(id)
     if not squad:
         return jsonify({"message": "Squad not found"}), HTTP_404_NOT_FOUND
@@ -3,6 +3,9 @@ from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT
 from app.extensions import db
 from app.models.ticket import Ticket
 from flask_jwt_extended import jwt_required
+from app.models.event import Event
+from app.auth import admin_required
+from app.bulk import bulk_load, required, to_float, to_int
 
 ticket_bp = Blueprint('ticket_bp', __name__, url_prefix='/api/v1/ticket')
 
@@ -29,6 +32,23 @@ def create_ticket():
     except Exception as e:
         return jsonify({"error": str(e)}), HTTP_400_BAD_REQUEST
 
+def ticket_row(data):
+    required(data, 'event_id', 'price', 'section', 'row', 'seat')
+    return {
+        "event_id": to_int(data, 'event_id'),
+        "price": to_float(data, 'price'),
+        "section": str(data['section']),
+        "row": str(data['row']),
+        "seat": str(data['seat'])
+    }
+
+# Create many tickets; upsert matches on the seat (event, section, row, seat) and reprices it
+@ticket_bp.route('/bulk', methods=['POST'])
+@admin_required("Access forbidden: Only admins can create tickets in bulk")
+def bulk_create_tickets():
+    return bulk_load(Ticket, ticket_row, key=('event_id', 'section', 'row', 'seat'), unique=True,
+                     references={"event_id": Event})
+
 @ticket_bp.route('/tickets/<int:ticket_id>', methods=['DELETE'])
 @jwt_required()  # Ensure the user is authenticated
 def delete_ticket(ticket_id):
@@ -1,12 +1,17 @@
 from flask import Blueprint, request, jsonify
-from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND,HTTP_200_OK
-from app.models.user import User
+from app.statuscodes import HTTP_400_BAD_REQUEST, HTTP_201_CREATED, HTTP_404_NOT_FOUND,HTTP_200_OK, HTTP_401_UNAUTHORIZED
+from app.models.user import User, user_serializer
 from app.extensions import db, bcrypt
-import validators
-from flask_jwt_extended import create_access_token,jwt_required, get_jwt_identity, unset_jwt_cookies
+from app.auth import role_claims, user_cache
+from app.hashing import HashingBusy
+from app.blocklist import revoke_token
+from app.pagination import paginate
+from app.streaming import stream_rows, wants_stream
+from app.lazy import lazy_import
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, jwt_required, get_jwt, get_jwt_identity, unset_jwt_cookies
 from datetime import datetime
 
-
+validators = lazy_import('validators')
 
 # user blueprint
 user_bp = Blueprint('user_bp', __name__, url_prefix='/api/v1/user')
@@ -14,6 +19,9 @@ user_bp = Blueprint('user_bp', __name__, url_prefix='/api/v1/user')
 # Define user roles
 USER_ROLES = ['user', 'admin']
 
+# User fields returned by register and login
+USER_SESSION_KEYS = ("id", "first_name", "last_name", "email", "join_date", "membership_status", "user_type")
+
 # Admin default credentials
 ADMIN_EMAIL = "admin@default.com"
 ADMIN_PASSWORD = "admin@default.com"
@@ -80,15 +88,7 @@ def register_user():
 
     return jsonify({
         "message": "User created successfully",
-        "user": {
-            "id": new_user.id,
-            "first_name": new_user.first_name,
-            "last_name": new_user.last_name,
-            "email": new_user.email,
-            "join_date": new_user.join_date,
-            "membership_status": new_user.membership_status,
-            "user_type": new_user.user_type  # Added user_type in response
-        }
+        "user": user_serializer.dump(new_user, USER_SESSION_KEYS)
     }), HTTP_201_CREATED
 
 # User login
@@ -131,24 +131,59 @@ def login_user():
     if not user or not bcrypt.check_password_hash(user.password, password):
         return jsonify({"error": "Invalid email or password"}), HTTP_400_BAD_REQUEST
 
-    # Create access token
-    access_token = create_access_token(identity=user.id)
+    # Upgrade hashes made with an outdated work factor
+    if bcrypt.needs_rehash(user.password):
+        try:
+            user.password = bcrypt.generate_password_hash(password).decode('utf-8')
+            db.session.commit()
+        except Exception:
+            # keep the old hash, the upgrade is retried on the next login
+            db.session.rollback()
+
+    # Create access and refresh tokens
+    access_token = create_access_token(identity=user.id, additional_claims=role_claims(user.user_type))
+    refresh_token = create_refresh_token(identity=user.id)
 
     return jsonify({
         "message": "User logged in successfully",
-        "user": {
-            "id": user.id,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "email": user.email,
-            "join_date": user.join_date.strftime("%Y-%m-%d"),
-            "membership_status": user.membership_status,
-            "user_type": user.user_type
-        },
-        "access_token": access_token
+        "user": user_serializer.dump(user, USER_SESSION_KEYS),
+        "access_token": access_token,
+        "refresh_token": refresh_token
     }), HTTP_200_OK
 
 
+# Mint a new access token from a refresh token, without a password check
+@user_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_access_token():
+    user_id = get_jwt_identity()
+    role = user_cache.get(user_id)
+    if role is None:
+        return jsonify({"error": "User not found"}), HTTP_401_UNAUTHORIZED
+
+    access_token = create_access_token(identity=user_id, additional_claims=role_claims(role))
+    return jsonify({"access_token": access_token}), HTTP_200_OK
+
+
+# User logout, revokes the presented token and optionally the refresh token in the body
+@user_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout_user():
+    revoke_token(get_jwt())
+
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token')
+    if refresh_token:
+        try:
+            revoke_token(decode_token(refresh_token))
+        except Exception as e:
+            return jsonify({"error": "Invalid refresh token", "details": str(e)}), HTTP_400_BAD_REQUEST
+
+    response = jsonify({"message": "User logged out successfully"})
+    unset_jwt_cookies(response)
+    return response, HTTP_200_OK
+
+
 
 # get a user
 @user_bp.route('/user/<int:id>', methods=['GET'])
@@ -160,22 +195,8 @@ def get_user(id):
         if not user:
             return jsonify({"error": "User not found"}), HTTP_404_NOT_FOUND
 
-        # Ensure join_date is converted to string only if it's a datetime object
-        join_date_str = user.join_date.strftime("%Y-%m-%d") if isinstance(user.join_date, datetime) else user.join_date
-
         # Return user details
-        return jsonify({
-            "user": {
-                "id": user.id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "contact": user.contact,
-                "email": user.email,
-                "join_date": join_date_str,
-                "membership_status": user.membership_status,
-                "user_type": user.user_type
-            }
-        }), HTTP_200_OK
+        return jsonify({"user": user_serializer.dump(user)}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving the user", "details": str(e)}), HTTP_400_BAD_REQUEST
@@ -184,29 +205,14 @@ def get_user(id):
 @user_bp.route('/users', methods=['GET'])
 def get_all_users():
     try:
-        # Retrieve all users
-        users = User.query.all()
+        # Full-table export, streamed row by row
+        if wants_stream():
+            return stream_rows(User, user_serializer, "users")
 
-        users_data = []
+        # Retrieve a page of users
+        users_data, next_cursor = paginate(User, user_serializer)
 
-        for user in users:
-            # Convert join_date to string if it's a datetime object
-            join_date_str = user.join_date.strftime("%Y-%m-%d") if isinstance(user.join_date, datetime) else user.join_date
-
-            user_info = {
-                "id": user.id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "contact": user.contact,
-                "email": user.email,
-                "join_date": join_date_str,
-                "membership_status": user.membership_status,
-                "user_type": user.user_type
-            }
-
-            users_data.append(user_info)
-
-        return jsonify({"users": users_data}), HTTP_200_OK
+        return jsonify({"users": users_data, "next": next_cursor}), HTTP_200_OK
 
     except Exception as e:
         return jsonify({"error": "An error occurred while retrieving users", "details": str(e)}), HTTP_400_BAD_REQUEST
@@ -246,21 +252,16 @@ def update_user(id):
 
         # Commit changes to the database
         db.session.commit()
+        user_cache.invalidate(user.id)
 
         return jsonify({
             "message": "User updated successfully",
-            "user": {
-                "id": user.id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "contact": user.contact,
-                "email": user.email,
-                "join_date": user.join_date.strftime("%Y-%m-%d"),
-                "membership_status": user.membership_status,
-                "user_type": user.user_type
-            }
+            "user": user_serializer.dump(user)
         }), HTTP_200_OK
 
+    except HashingBusy:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "An error occurred while updating the user", "details": str(e)}), HTTP_400_BAD_REQUEST
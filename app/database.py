@@ -0,0 +1,168 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from app.extensions import db
+
+
+# Adds MYSQL_CONNECT_ARGS to the engine options of the default bind and of every other bind
+# whose URL is MySQL/MariaDB. Must run before db.init_app, after anything that adds binds.
+def apply_mysql_connect_args(app):
+    connect_args = app.config.get('MYSQL_CONNECT_ARGS')
+    if not connect_args:
+        return
+    if _is_mysql(app.config.get('SQLALCHEMY_DATABASE_URI')):
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        options['connect_args'] = {**connect_args, **options.get('connect_args', {})}
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    binds = {}
+    for key, value in (app.config.get('SQLALCHEMY_BINDS') or {}).items():
+        if isinstance(value, dict):
+            value = dict(value)
+            url = value.get('url')
+        else:
+            url = value
+        if _is_mysql(url):
+            if not isinstance(value, dict):
+                value = {'url': value}
+            value['connect_args'] = {**connect_args, **value.get('connect_args', {})}
+        binds[key] = value
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def _is_mysql(url):
+    return url is not None and make_url(url).get_backend_name() in ('mysql', 'mariadb')
+
+
+# Runs the configured PRAGMA statements on every new SQLite connection
+def apply_sqlite_pragmas(engine, pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    event.listen(engine, 'connect', set_pragmas)
+
+
+# session.begin_nested() that is safe on pysqlite too. The driver only opens its transaction at
+# the first INSERT/UPDATE/DELETE; a SAVEPOINT before that starts one of its own, and releasing
+# the savepoint would then commit everything done so far.
+def begin_savepoint(session):
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+    return session.begin_nested()
+
+
+# Connection pool counters for one engine
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.invalidated = 0
+
+
+# Pool state per bind: the pool's own size/checked-out/overflow numbers plus how often
+# and how long requests waited for a connection, timed around Pool.connect.
+class PoolTelemetry:
+    def __init__(self):
+        self.engines = {}
+        self.stats = {}
+        self.listeners = []
+        self.wait_threshold = 0.001
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.wait_threshold = app.config.get('POOL_WAIT_THRESHOLD_MS', 1) / 1000
+        pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+        self.engines = {}
+        self.stats = {}
+
+        with app.app_context():
+            engines = {bind or 'default': engine for bind, engine in db.engines.items()}
+        for bind, engine in engines.items():
+            if pragmas and engine.dialect.name == 'sqlite':
+                apply_sqlite_pragmas(engine, pragmas)
+            self.instrument(engine, bind)
+        app.extensions['pool_telemetry'] = self
+
+    def instrument(self, engine, bind):
+        self.engines[bind] = engine
+        self._stats(bind)
+        self._wrap(engine, bind)
+        # dispose() swaps in a fresh pool that needs the wrapper again
+        event.listen(engine, 'engine_disposed', lambda engine: self._wrap(engine, bind))
+        event.listen(engine, 'invalidate', lambda *args: self._count_invalidation(bind))
+
+    # Called with (bind, seconds) after every pool checkout
+    def on_wait(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+        return listener
+
+    def _wrap(self, engine, bind):
+        connect = engine.pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            except PoolTimeout:
+                with self._lock:
+                    self._stats(bind).timeouts += 1
+                raise
+            finally:
+                self._record(bind, time.perf_counter() - started)
+        engine.pool.connect = timed_connect
+
+    def _record(self, bind, seconds):
+        with self._lock:
+            stats = self._stats(bind)
+            stats.checkouts += 1
+            if seconds >= self.wait_threshold:
+                stats.waited += 1
+                stats.wait_total += seconds
+                stats.wait_max = max(stats.wait_max, seconds)
+        for listener in self.listeners:
+            listener(bind, seconds)
+
+    def _count_invalidation(self, bind):
+        with self._lock:
+            self._stats(bind).invalidated += 1
+
+    def _stats(self, bind):
+        return self.stats.setdefault(bind, PoolStats())
+
+    def status(self):
+        result = {}
+        for bind, engine in self.engines.items():
+            pool = engine.pool
+            stats = self._stats(bind)
+            state = {"pool": type(pool).__name__}
+            for key, attr in (('size', 'size'), ('checked_out', 'checkedout'),
+                              ('checked_in', 'checkedin'), ('overflow', 'overflow')):
+                fn = getattr(pool, attr, None)
+                if fn is not None:
+                    state[key] = fn()
+            if 'overflow' in state:
+                # QueuePool counts overflow from -pool_size
+                state['overflow'] = max(state['overflow'], 0)
+            state.update({
+                "checkouts": stats.checkouts,
+                "waited": stats.waited,
+                "wait_ms_total": round(stats.wait_total * 1000, 3),
+                "wait_ms_max": round(stats.wait_max * 1000, 3),
+                "timeouts": stats.timeouts,
+                "invalidated": stats.invalidated
+            })
+            result[bind] = state
+        return result
+
+
+pool_telemetry = PoolTelemetry()
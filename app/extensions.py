@@ -1,9 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
+from app.hashing import PasswordHasher
+from app.replicas import RoutingSession
+from app.lazy import LazyMigrate
 from flask_jwt_extended import JWTManager
 
-migrate = Migrate()
-db = SQLAlchemy()
-bcrypt = Bcrypt ()
+# flask_migrate pulls in alembic, which only `flask db` commands need
+migrate = LazyMigrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+bcrypt = PasswordHasher()
 jwt = JWTManager()
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Raised when every hashing worker is busy and the wait queue is full
+class HashingBusy(Exception):
+    pass
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+# These run inside the worker processes, so they have to live at module level
+def _hash_password(password, rounds):
+    import bcrypt
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check_password(pw_hash, password):
+    import bcrypt
+    return bcrypt.checkpw(password, pw_hash)
+
+
+# The pool is created on first use from a request thread. Forking a multi-threaded process can
+# copy a lock another thread is holding into the child, so the workers come from a fork server
+# (a clean single-threaded process that has imported this module) or, without one, are spawned.
+# Either way the workers re-import the main module, so a script that hashes through the pool
+# needs the usual `if __name__ == '__main__':` guard (gunicorn's and flask's entry points have it).
+def _mp_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+# Drop-in replacement for flask_bcrypt.Bcrypt that runs bcrypt in a bounded process pool.
+# With BCRYPT_POOL_SIZE = 0 hashing runs inline on the request thread.
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.pool_size = 0
+        self.queue_size = 0
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.pool_size = app.config.get('BCRYPT_POOL_SIZE', 0)
+        self.queue_size = app.config.get('BCRYPT_QUEUE_SIZE', 16)
+        self._slots = threading.BoundedSemaphore(self.pool_size + self.queue_size)
+        app.extensions['bcrypt'] = self
+
+    # Worker processes must not be shared with forked children
+    def _reset(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        if self._slots is not None:
+            self._slots = threading.BoundedSemaphore(self.pool_size + self.queue_size)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.pool_size, mp_context=_mp_context())
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.pool_size:
+            return fn(*args)
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    def generate_password_hash(self, password, rounds=None):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash_password, _to_bytes(password), rounds or self.rounds)
+
+    def check_password_hash(self, pw_hash, password):
+        return self._run(_check_password, _to_bytes(pw_hash), _to_bytes(password))
+
+    # True when the stored hash was made with a different work factor than the configured one
+    def needs_rehash(self, pw_hash):
+        parts = _to_bytes(pw_hash).split(b'$')
+        try:
+            return int(parts[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
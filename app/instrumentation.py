@@ -0,0 +1,126 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app.extensions import db
+
+logger = logging.getLogger('app.sql')
+
+# expanded IN lists render a different number of placeholders per call
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+
+
+def statement_shape(statement):
+    return _IN_LIST.sub('(?)', ' '.join(statement.split()))
+
+
+# SQL statements issued while serving one request
+class RequestSQLStats:
+    __slots__ = ('started_at', 'count', 'total', 'slowest', 'slowest_statement', 'shapes')
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    # Statement shapes run at least `threshold` times, typically lazy relationships loaded in a loop
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def current_sql_stats():
+    return g.get('sql_stats') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start'].pop()
+    stats = current_sql_stats()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+# Records statement count, DB time and the slowest statement per request, warns about
+# repeated statement shapes (N+1 queries), logs requests slower than SLOW_REQUEST_MS as
+# one JSON line, and adds a Server-Timing header in debug mode (SQL_SERVER_TIMING).
+class SQLInstrumentation:
+    def init_app(self, app):
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS', 500)
+        self.n_plus_one_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+        server_timing = app.config.get('SQL_SERVER_TIMING')
+        self.server_timing = app.debug if server_timing is None else server_timing
+
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument(engine)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions['sql_instrumentation'] = self
+
+    def instrument(self, engine):
+        if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def _start(self):
+        g.sql_stats = RequestSQLStats()
+
+    def _finish(self, response):
+        stats = current_sql_stats()
+        if stats is None:
+            return response
+
+        duration = time.perf_counter() - stats.started_at
+        repeated = stats.repeated(self.n_plus_one_threshold)
+        if repeated:
+            logger.warning(json.dumps({
+                "event": "n_plus_one",
+                "endpoint": request.endpoint,
+                "path": request.path,
+                "statements": [{"shape": shape, "count": count} for shape, count in repeated]
+            }))
+
+        if duration * 1000 >= self.slow_request_ms:
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "db_ms": round(stats.total * 1000, 2),
+                "statements": stats.count,
+                "slowest_ms": round(stats.slowest * 1000, 2),
+                "slowest_statement": stats.slowest_statement,
+                "repeated": [{"shape": shape, "count": count} for shape, count in repeated]
+            }))
+
+        if self.server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.total * 1000:.2f};desc="statements={stats.count}", app;dur={duration * 1000:.2f}'
+            )
+        return response
+
+
+sql_instrumentation = SQLInstrumentation()
@@ -0,0 +1,85 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+# Types orjson (and msgpack) don't handle on their own. Decimals keep the string form
+# the default provider always produced so Numeric columns don't change on the wire.
+def _default(o):
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+def wants_msgpack():
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+# JSON provider backed by orjson when it is installed, falling back to the stdlib encoder.
+# Dates and datetimes are written as ISO 8601. Clients sending Accept: application/msgpack
+# get MessagePack bodies from jsonify() instead.
+class FastJSONProvider(DefaultJSONProvider):
+    def _orjson_option(self, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._orjson_option()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+
+        if wants_msgpack():
+            body = msgpack.packb(obj, default=_default, use_bin_type=True)
+            return self._vary(self._app.response_class(body, mimetype=MSGPACK_MIMETYPES[0]))
+
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is None:
+            if pretty:
+                body = self.dumps(obj, indent=2)
+            else:
+                body = self.dumps(obj, separators=(',', ':'))
+            return self._vary(self._app.response_class(f"{body}\n", mimetype=self.mimetype))
+
+        body = orjson.dumps(obj, default=_default, option=self._orjson_option(pretty) | orjson.OPT_APPEND_NEWLINE)
+        return self._vary(self._app.response_class(body, mimetype=self.mimetype))
+
+    # The body depends on the Accept header once MessagePack is available
+    def _vary(self, response):
+        if msgpack is not None:
+            response.vary.add('Accept')
+        return response
@@ -0,0 +1,64 @@
+import importlib.util
+import sys
+
+import click
+from flask import g
+from flask.cli import with_appcontext
+
+
+# Module object whose code only runs on first attribute access
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# `flask db` group that imports flask_migrate (and alembic with it) only when a
+# migration command actually runs. Takes the same options as flask_migrate's group.
+class _LazyMigrateGroup(click.Group):
+    def __init__(self, app, db, migrate_kwargs, **kwargs):
+        params = [
+            click.Option(['-d', '--directory'], default=None,
+                         help='Migration script directory (default is "migrations")'),
+            click.Option(['-x', '--x-arg'], multiple=True,
+                         help='Additional arguments consumed by custom env.py scripts')
+        ]
+        super().__init__(params=params, callback=with_appcontext(_set_migrate_options), **kwargs)
+        self.app = app
+        self.db = db
+        self.migrate_kwargs = migrate_kwargs
+
+    def _group(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_cli_group
+
+        if 'migrate' not in self.app.extensions:
+            Migrate(self.app, self.db, **self.migrate_kwargs)
+        return db_cli_group
+
+    def list_commands(self, ctx):
+        return self._group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._group().get_command(ctx, name)
+
+
+# picked up by Migrate.get_config(), as in flask_migrate.cli.db
+def _set_migrate_options(directory, x_arg):
+    g.directory = directory
+    g.x_arg = x_arg
+
+
+# Stand-in for flask_migrate.Migrate with the same init_app signature
+class LazyMigrate:
+    def init_app(self, app, db=None, **kwargs):
+        app.cli.add_command(_LazyMigrateGroup(app, db, kwargs, name='db', help='Perform database migrations.'))
@@ -0,0 +1,220 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from app.database import pool_telemetry
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+# In-process counters and histograms. Each worker writes its snapshot to
+# METRICS_DIR/metrics-<pid>.json, and /metrics adds up every worker's file, so the
+# numbers don't depend on which worker answered the scrape.
+class MetricsRegistry:
+    def __init__(self):
+        self.directory = None
+        self.flush_interval = 1.0
+        self._counters = {}
+        self._histograms = {}
+        self._gauge_sources = []
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flusher = None
+
+    def init_app(self, app):
+        self.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+        os.makedirs(self.directory, exist_ok=True)
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+        pool_telemetry.on_wait(self._observe_pool_wait)
+        self._gauge_sources = [_pool_gauges]
+        cache = app.extensions.get('response_cache')
+        if cache is not None:
+            self.gauge_source(lambda: [(f'recess_response_cache_{key}', {}, value) for key, value in cache.stats().items()])
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions['metrics'] = self
+
+    # A forked worker starts from zero, the parent's numbers stay in the parent's file
+    def _reset(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flusher = None
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [list(buckets), [0] * (len(buckets) + 1), 0.0, 0]
+            histogram[1][bisect_left(histogram[0], value)] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    # `fn` returns [(name, labels, value)] describing live state of this process
+    def gauge_source(self, fn):
+        self._gauge_sources.append(fn)
+        return fn
+
+    def _start(self):
+        g.metrics_started_at = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.pop('metrics_started_at', None)
+        if started is None:
+            return response
+        labels = {
+            "blueprint": request.blueprint or "app",
+            "endpoint": request.endpoint or "unmatched",
+            "method": request.method
+        }
+        self.inc('recess_http_requests_total', dict(labels, status=str(response.status_code)))
+        self.observe('recess_http_request_duration_seconds', labels, time.perf_counter() - started)
+        self._dirty = True
+        if self._flusher is None:
+            self._start_flusher()
+        return response
+
+    # Background thread writing this worker's snapshot every METRICS_FLUSH_INTERVAL,
+    # so an idle worker's last requests still reach its file
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(max(self.flush_interval, 0.1))
+            if self._dirty:
+                self.flush()
+
+    def _observe_pool_wait(self, bind, seconds):
+        self.observe('recess_db_pool_checkout_wait_seconds', {"bind": bind}, seconds, POOL_WAIT_BUCKETS)
+
+    def snapshot(self):
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), h[0], list(h[1]), h[2], h[3]] for (name, labels), h in self._histograms.items()]
+        gauges = []
+        for source in self._gauge_sources:
+            gauges.extend([name, sorted(labels.items()), value] for name, labels, value in source())
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def flush(self):
+        if self.directory is None:
+            return
+        self._dirty = False
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp, path)
+
+    # Drop every worker's file, for a server (re)start
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # Sum the snapshots of every worker, gauges only from workers that are still alive
+    def collect(self):
+        self.flush()
+        counters, histograms, gauges = {}, {}, {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+
+            for name, labels, value in data["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, counts, total, count in data["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [buckets, [0] * len(counts), 0.0, 0])
+                merged[1] = [a + b for a, b in zip(merged[1], counts)]
+                merged[2] += total
+                merged[3] += count
+            if _alive(data["pid"]):
+                for name, labels, value in data["gauges"]:
+                    key = (name, tuple(map(tuple, labels)))
+                    gauges[key] = gauges.get(key, 0) + value
+        return counters, histograms, gauges
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{str(value)}"' for key, value in labels) + '}'
+
+
+# Prometheus text exposition format
+def render_prometheus(counters, histograms, gauges):
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+        lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, 'gauge')
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _pool_gauges():
+    values = []
+    for bind, state in pool_telemetry.status().items():
+        for key in ('size', 'checked_out', 'checked_in', 'overflow', 'waited', 'timeouts', 'invalidated'):
+            if key in state:
+                values.append((f'recess_db_pool_{key}', {"bind": bind}, state[key]))
+    return values
+
+
+metrics = MetricsRegistry()
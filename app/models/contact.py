@@ -1,8 +1,10 @@
 from app.extensions import db
+from app.models.serializer import Serializer, date_formatter
 from datetime import datetime
 
 class Contact(db.Model):
     __tablename__ = "contacts"
+    __table_args__ = (db.Index('ix_contacts_date', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), nullable=False, unique=True)
@@ -23,3 +25,13 @@ class Contact(db.Model):
 
     def get_contact_summary(self):
         return f'Name: {self.name}, Email: {self.email}, Message: {self.message}'
+
+
+contact_serializer = Serializer({
+    "id": "id",
+    "name": "name",
+    "email": "email",
+    "message": "message",
+    "date": ("date", date_formatter("%Y-%m-%d %H:%M:%S")),
+    "user_id": "user_id"
+})
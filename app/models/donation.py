@@ -1,8 +1,13 @@
 from app.extensions import db
+from app.models.serializer import Serializer, date_formatter
 from datetime import datetime
 
 class Donation(db.Model):
     __tablename__ = "donations"
+    __table_args__ = (
+        db.Index('ix_donations_user_id_donation_date', 'user_id', 'donation_date'),
+        db.Index('ix_donations_donation_date', 'donation_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -24,3 +29,14 @@ class Donation(db.Model):
 
     def get_donation_summary(self):
         return f'Donation Amount: ${self.amount:.2f}, Date: {self.donation_date}, Message: {self.message or "No message"}'
+
+
+donation_serializer = Serializer({
+    "id": "id",
+    "amount": "amount",
+    "message": "message",
+    "date": ("donation_date", date_formatter("%Y-%m-%d")),
+    "user_id": "user_id",
+    "name": "name",
+    "contact": "contact"
+})
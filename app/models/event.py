@@ -1,8 +1,10 @@
 from app.extensions import db
+from app.models.serializer import Serializer, date_formatter
 from datetime import datetime
 
 class Event(db.Model):
     __tablename__ = "events"
+    __table_args__ = (db.Index('ix_events_date', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     description = db.Column(db.String(255), nullable=False)
@@ -21,3 +23,12 @@ class Event(db.Model):
 
     def get_event_summary(self):
         return f'Event: {self.name}, Date: {self.date}, Location: {self.location} '
+
+
+event_serializer = Serializer({
+    "id": "id",
+    "name": "name",
+    "description": "description",
+    "date": ("date", date_formatter("%Y-%m-%d %H:%M:%S")),
+    "location": "location"
+})
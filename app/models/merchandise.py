@@ -1,7 +1,10 @@
 from app.extensions import db
+from app.models.serializer import Serializer
 
 class Merchandise(db.Model):
     __tablename__ = "merchandises"
+    # bulk upserts match items on name and category
+    __table_args__ = (db.Index('ix_merchandises_name_category', 'name', 'category'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     description = db.Column(db.String(255), nullable=False)
@@ -24,3 +27,14 @@ class Merchandise(db.Model):
 
     def get_item_summary(self):
         return f'Item: {self.name}, Price: ${self.price:.2f}'
+
+
+merchandise_serializer = Serializer({
+    "id": "id",
+    "name": "name",
+    "description": "description",
+    "price": "price",
+    "stock": "stock",
+    "image": "image",
+    "category": "category"
+})
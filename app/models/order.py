@@ -1,13 +1,24 @@
 from app.extensions import db
+from app.models.serializer import Serializer, date_formatter
+from app.models.orderitem import OrderItem
 from datetime import datetime
 
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # a user's orders, newest first
+        db.Index('ix_orders_user_id_order_date', 'user_id', 'order_date'),
+        # every user's orders, newest first (admin order history)
+        db.Index('ix_orders_order_date', 'order_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     order_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     status_of_order = db.Column(db.String(30), nullable=False)
     address_of_delivery = db.Column(db.String(255), nullable=False)
+    # sum of the items' total_amount and quantity, kept in step by add_to_order_totals
+    order_total = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # relationships
     user = db.relationship("User", back_populates="orders")
@@ -21,3 +32,34 @@ class Order(db.Model):
 
     def get_order_summary(self):
         return f'Order Date: {self.order_date}, Status: {self.status_of_order}, Delivery Address: {self.address_of_delivery}'
+
+
+# Applies a change to an order's items to its totals, in the caller's transaction. One relative
+# UPDATE, so concurrent changes to the same order's items can't overwrite each other.
+def add_to_order_totals(order_id, amount, count):
+    db.session.execute(
+        db.update(Order).where(Order.id == order_id)
+        .values(order_total=db.func.round(Order.order_total + amount, 2), item_count=Order.item_count + count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Statement recomputing the totals from the items, for orders with low < id <= high
+def recalculate_order_totals(low, high):
+    items = db.select(OrderItem).where(OrderItem.order_id == Order.id)
+    return db.update(Order).where(Order.id > low, Order.id <= high).values(
+        order_total=items.with_only_columns(db.func.coalesce(db.func.round(db.func.sum(OrderItem.total_amount), 2), 0))
+        .scalar_subquery(),
+        item_count=items.with_only_columns(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).scalar_subquery()
+    )
+
+
+order_serializer = Serializer({
+    "id": "id",
+    "user_id": "user_id",
+    "order_date": ("order_date", date_formatter("%Y-%m-%d %H:%M:%S")),
+    "status_of_order": "status_of_order",
+    "address_of_delivery": "address_of_delivery",
+    "order_total": "order_total",
+    "item_count": "item_count"
+})
@@ -1,7 +1,13 @@
 from app.extensions import db
+from app.models.serializer import Serializer
 
 class OrderItem(db.Model):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # items of an order, together with what they refer to
+        db.Index('ix_order_items_order_id_merchandise_id', 'order_id', 'merchandise_id'),
+        db.Index('ix_order_items_merchandise_id', 'merchandise_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
     merchandise_id = db.Column(db.Integer, db.ForeignKey("merchandises.id"), nullable=False)
@@ -22,3 +28,13 @@ class OrderItem(db.Model):
 
     def get_total_price(self):
         return f'Total Price: ${self.total_amount:.2f}'
+
+
+order_item_serializer = Serializer({
+    "id": "id",
+    "order_id": "order_id",
+    "merchandise_id": "merchandise_id",
+    "quantity": "quantity",
+    "price_of_item": "price_of_item",
+    "total_amount": "total_amount"
+})
@@ -1,7 +1,9 @@
 from app.extensions import db
+from app.models.serializer import Serializer
 
 class PlayerStatistic(db.Model):
     __tablename__ = "playerstatistics"
+    __table_args__ = (db.Index('ix_playerstatistics_squad_id', 'squad_id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     squad_id = db.Column(db.Integer, db.ForeignKey("squads.id"), nullable=False)
@@ -30,3 +32,16 @@ class PlayerStatistic(db.Model):
                 f'conversions={self.conversions}, penalties={self.penalties}, '
                 f'yellow_cards={self.yellow_cards}, red_cards={self.red_cards}, '
                 f'minutes_played={self.minutes_played}>')
+
+
+player_statistic_serializer = Serializer({
+    "id": "id",
+    "squad_id": "squad_id",
+    "matches_played": "matches_played",
+    "tries_scored": "tries_scored",
+    "conversions": "conversions",
+    "penalties": "penalties",
+    "yellow_cards": "yellow_cards",
+    "red_cards": "red_cards",
+    "minutes_played": "minutes_played"
+})
@@ -0,0 +1,24 @@
+from app.extensions import db
+from datetime import datetime
+
+class StockReservation(db.Model):
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        db.Index('ix_stock_reservations_order_id_merchandise_id', 'order_id', 'merchandise_id'),
+        db.Index('ix_stock_reservations_expires_at', 'expires_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
+    merchandise_id = db.Column(db.Integer, db.ForeignKey("merchandises.id"), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __init__(self, order_id, merchandise_id, quantity, expires_at):
+        self.order_id = order_id
+        self.merchandise_id = merchandise_id
+        self.quantity = quantity
+        self.expires_at = expires_at
+
+    def __repr__(self):
+        return f'<StockReservation order_id={self.order_id}, merchandise_id={self.merchandise_id}, quantity={self.quantity}>'
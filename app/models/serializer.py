@@ -0,0 +1,86 @@
+from datetime import datetime
+from operator import attrgetter, itemgetter
+
+
+# Formatter for date/datetime columns, values that are not dates (None, raw strings) pass through.
+# The two formats the API uses are mapped onto isoformat, which is much cheaper than strftime.
+def date_formatter(fmt):
+    if fmt == "%Y-%m-%d":
+        def format_value(value):
+            return value.isoformat()[:10] if hasattr(value, 'isoformat') else value
+    elif fmt == "%Y-%m-%d %H:%M:%S":
+        def format_value(value):
+            if isinstance(value, datetime) and value.tzinfo is None:
+                return value.isoformat(' ', 'seconds')
+            return value.strftime(fmt) if hasattr(value, 'strftime') else value
+    else:
+        def format_value(value):
+            return value.strftime(fmt) if hasattr(value, 'strftime') else value
+    return format_value
+
+
+# Turns model instances (or result rows) into dicts.
+# `fields` maps output key -> attribute name, or -> (attribute name, formatter).
+# Each requested key set is compiled once into attrgetters and cached.
+class Serializer:
+    def __init__(self, fields):
+        self.fields = fields
+        self.keys = tuple(fields)
+        self._compiled = {}
+
+    def attribute(self, key):
+        spec = self.fields[key]
+        return spec[0] if isinstance(spec, tuple) else spec
+
+    # Attribute names needed to render the given keys
+    def columns(self, keys=None):
+        names = []
+        for key in keys or self.keys:
+            name = self.attribute(key)
+            if name not in names:
+                names.append(name)
+        return names
+
+    # Loaded column values are read straight from the instance __dict__, skipping the
+    # instrumented attribute descriptors. Unloaded attributes and result rows fall back to getattr.
+    def _compile(self, keys):
+        names = tuple(self.attribute(key) for key in keys)
+        formatters = tuple((i, self.fields[key][1]) for i, key in enumerate(keys)
+                           if isinstance(self.fields[key], tuple))
+
+        if len(names) == 1:
+            get_item, get_attr = itemgetter(names[0]), attrgetter(names[0])
+
+            def get_items(values):
+                return (get_item(values),)
+
+            def get_attrs(obj):
+                return (get_attr(obj),)
+        else:
+            get_items, get_attrs = itemgetter(*names), attrgetter(*names)
+
+        def dump(obj):
+            try:
+                values = get_items(obj.__dict__)
+            except (AttributeError, KeyError):
+                values = get_attrs(obj)
+            data = dict(zip(keys, values))
+            for i, fmt in formatters:
+                key = keys[i]
+                data[key] = fmt(data[key])
+            return data
+        return dump
+
+    def compiled(self, keys=None):
+        keys = tuple(keys) if keys else self.keys
+        dump = self._compiled.get(keys)
+        if dump is None:
+            dump = self._compiled[keys] = self._compile(keys)
+        return dump
+
+    def dump(self, obj, keys=None):
+        return self.compiled(keys)(obj)
+
+    def dump_many(self, objs, keys=None):
+        dump = self.compiled(keys)
+        return [dump(obj) for obj in objs]
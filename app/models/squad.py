@@ -1,4 +1,5 @@
 from app.extensions import db
+from app.models.serializer import Serializer, date_formatter
 
 class Squad(db.Model):
     __tablename__ = "squads"
@@ -32,3 +33,17 @@ class Squad(db.Model):
 
     def get_full_name(self):
         return f'{self.first_name} {self.last_name}'
+
+
+squad_serializer = Serializer({
+    "id": "id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "position": "position",
+    "jersey_number": "jersey_number",
+    "biography": "biography",
+    "image": "image",
+    "weight": "weight",
+    "height": "height",
+    "date_of_birth": ("date_of_birth", date_formatter("%Y-%m-%d"))
+})
@@ -1,7 +1,10 @@
 from app.extensions import db
+from app.models.serializer import Serializer
 
 class Ticket(db.Model):
     __tablename__ = "tickets"
+    # tickets of an event; the full seat also makes bulk upsert lookups an index search
+    __table_args__ = (db.Index('ix_tickets_event_id_section_row_seat', 'event_id', 'section', 'row', 'seat'),)
     
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)  # Assuming 'events' is the table name
@@ -20,3 +23,13 @@ class Ticket(db.Model):
 
     def __repr__(self):
         return f'<Ticket id={self.id}, event_id={self.event_id}, section="{self.section}", row="{self.row}", seat="{self.seat}", price={self.price}>'
+
+
+ticket_serializer = Serializer({
+    "id": "id",
+    "event_id": "event_id",
+    "price": "price",
+    "section": "section",
+    "row": "row",
+    "seat": "seat"
+})
@@ -1,4 +1,5 @@
 from app.extensions import db
+from app.models.serializer import Serializer, date_formatter
 from datetime import datetime
 
 class User(db.Model):
@@ -32,3 +33,15 @@ class User(db.Model):
 
     def get_full_name(self):
         return f'{self.first_name} {self.last_name}'
+
+
+user_serializer = Serializer({
+    "id": "id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "contact": "contact",
+    "email": "email",
+    "join_date": ("join_date", date_formatter("%Y-%m-%d")),
+    "membership_status": "membership_status",
+    "user_type": "user_type"
+})
@@ -0,0 +1,64 @@
+from flask import current_app, request
+from sqlalchemy.orm import load_only
+
+
+# Raised for a malformed ?after=, ?limit= or ?fields= parameter
+class PaginationError(ValueError):
+    pass
+
+
+def int_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise PaginationError(f"Invalid {name} (must be an integer)")
+
+
+# ?limit=, within the configured bounds
+def limit_arg():
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 100)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 1000)
+    limit = int_arg('limit', default_limit)
+    if limit < 1 or limit > max_limit:
+        raise PaginationError(f"Invalid limit (must be between 1 and {max_limit})")
+    return limit
+
+
+# Requested output keys from ?fields=a,b,c, defaulting to every key the serializer knows
+def requested_fields(serializer):
+    value = request.args.get('fields')
+    if not value:
+        return serializer.keys
+
+    keys = tuple(key.strip() for key in value.split(',') if key.strip())
+    unknown = [key for key in keys if key not in serializer.fields]
+    if unknown:
+        raise PaginationError(f"Unknown field(s): {', '.join(unknown)}")
+    return keys
+
+
+# Keyset pagination on the primary key: ?after=<id>&limit=N&fields=a,b,c
+# Returns the serialized rows and the cursor for the next page (None on the last page).
+def paginate(model, serializer, query=None):
+    after = int_arg('after')
+    limit = limit_arg()
+    keys = requested_fields(serializer)
+
+    columns = set(serializer.columns(keys))
+    columns.add('id')
+
+    query = query if query is not None else model.query
+    query = query.options(load_only(*[getattr(model, name) for name in sorted(columns)]))
+    if after is not None:
+        query = query.filter(model.id > after)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+
+    return serializer.dump_many(rows, keys), next_cursor
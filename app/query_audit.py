@@ -0,0 +1,166 @@
+import re
+
+import click
+from flask import current_app, has_request_context, request
+from flask.cli import with_appcontext
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event
+
+from app.auth import role_claims
+from app.extensions import db
+from app.instrumentation import statement_shape
+from app.response_cache import response_cache
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+# revoke the token the sweep runs with
+SKIPPED_ENDPOINTS = frozenset(('user_bp.logout_user',))
+_SQUAD = {"first_name": "Audit", "last_name": "Player", "position": "Centre", "jersey_number": "99",
+          "biography": "-", "image": "-", "weight": 95, "height": 1.88}
+_MERCHANDISE = {"name": "Audit item", "description": "-", "price": 25, "stock": 100, "image": "-", "category": "Jerseys"}
+_EVENT = {"name": "Audit fixture", "description": "-", "date": "2025-06-01 15:00:00", "location": "-"}
+_TICKET = {"event_id": 1, "price": 30, "section": "Audit", "row": "A", "seat": "1"}
+# Request bodies that get past validation, so the views reach their queries; ids are 1 like the
+# URL arguments. Routes without one get an empty JSON object.
+SAMPLE_BODIES = {
+    'user_bp.register_user': {"first_name": "Audit", "last_name": "User", "contact": "audit", "email": "audit@example.com",
+                              "password": "auditpassword", "join_date": "2024-01-01 00:00:00",
+                              "membership_status": "Active", "user_type": "user"},
+    'user_bp.login_user': {"email": "audit@example.com", "password": "auditpassword"},
+    'squad_bp.create_squad': _SQUAD,
+    'squad_bp.update_squad': _SQUAD,
+    'squad_bp.bulk_create_squads': [_SQUAD],
+    'playerstatistics_bp.create_player_statistic': {"squad_id": 1, "matches_played": 3},
+    'playerstatistics_bp.bulk_create_player_statistics': [{"squad_id": 1, "matches_played": 3}],
+    'contact_bp.create_contact': {"name": "Audit", "email": "audit@example.com", "message": "-"},
+    'donation_bp.create_donation': {"amount": 50, "name": "Audit", "user_id": 1, "description": "-"},
+    'merchandise_bp.create_merchandise': _MERCHANDISE,
+    'merchandise_bp.update_merchandise': _MERCHANDISE,
+    'merchandise_bp.bulk_create_merchandise': {"mode": "upsert", "items": [_MERCHANDISE]},
+    'event_bp.create_event': _EVENT,
+    'event_bp.update_event': _EVENT,
+    'ticket_bp.create_ticket': _TICKET,
+    'ticket_bp.bulk_create_tickets': [_TICKET],
+    'order_bp.create_order': {"address_of_delivery": "-"},
+    'order_bp.checkout': {"address_of_delivery": "-", "items": [{"merchandise_id": 1, "quantity": 1}]},
+    'order_bp.bulk_update_order_status': {"ids": [1], "from": "Paid", "to": "Shipped"},
+    'orderitem_bp.create_order_item': {"order_id": 1, "merchandise_id": 1, "quantity": 1},
+}
+# need a refresh token rather than an access token
+REFRESH_ENDPOINTS = frozenset(('user_bp.refresh_access_token',))
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+class AuditedStatement:
+    def __init__(self, statement, parameters):
+        self.statement = statement
+        self.parameters = parameters
+        self.endpoints = set()
+        self.plan = []
+        self.scans = []
+        self.bounded = False
+
+
+# Calls every blueprint route once, as an admin, with 1 for each URL argument and the route's
+# SAMPLE_BODIES entry, and collects the SELECT/UPDATE/DELETE statements they run. Also returns
+# the routes that answered 4xx without running any query, whose queries went unaudited. The
+# views' commits only flush (see RoutingSession.commit) and everything is rolled back at the end.
+def sweep(app, user_id):
+    statements = {}
+    executed = [0]
+    unexplored = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        executed[0] += 1
+        if executemany or statement.lstrip().split(None, 1)[0].upper() not in EXPLAINABLE:
+            return
+        audited = statements.get(statement_shape(statement))
+        if audited is None:
+            audited = statements[statement_shape(statement)] = AuditedStatement(statement, parameters)
+        audited.endpoints.add(request.endpoint if has_request_context() else '-')
+
+    token = create_access_token(identity=user_id, additional_claims=role_claims('admin'))
+    headers = {'Authorization': 'Bearer ' + token}
+    refresh_headers = {'Authorization': 'Bearer ' + create_refresh_token(identity=user_id)}
+    client = app.test_client()
+    urls = app.url_map.bind('localhost')
+    engine = db.engine
+    session = db.session
+    cache_enabled = response_cache.enabled
+    response_cache.enabled = False
+    session.info['deferred_commit'] = True
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+            if '.' not in rule.endpoint or rule.endpoint in SKIPPED_ENDPOINTS:
+                continue
+            path = urls.build(rule.endpoint, {name: 1 for name in rule.arguments})
+            for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+                before = executed[0]
+                response = client.open(path, method=method,
+                                       headers=refresh_headers if rule.endpoint in REFRESH_ENDPOINTS else headers,
+                                       json=None if method == 'GET' else SAMPLE_BODIES.get(rule.endpoint, {}))
+                if 400 <= response.status_code < 500 and executed[0] == before:
+                    unexplored.append((method, rule.rule, rule.endpoint, response.status_code))
+        explain_all(session, statements.values())
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+        session.info.pop('deferred_commit', None)
+        session.info.pop('rolled_back', None)
+        session.rollback()
+        response_cache.enabled = cache_enabled
+    return sorted(statements.values(), key=lambda audited: sorted(audited.endpoints)), unexplored
+
+
+# A scan is bounded when the statement has a LIMIT and the rows come out in index order
+# (no sort step), so the scan stops after LIMIT rows: the keyset pagination pages
+def explain_all(session, statements):
+    connection = session.connection()
+    dialect = connection.dialect.name
+    tables = set(db.metadata.tables)
+    for audited in statements:
+        if dialect == 'sqlite':
+            rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + audited.statement, audited.parameters).all()
+            audited.plan = [row[-1] for row in rows]
+            audited.scans = [match.group(1) for match in map(_SQLITE_SCAN.match, audited.plan)
+                             if match and match.group(1) in tables]
+            sorts = any('TEMP B-TREE' in line for line in audited.plan)
+        elif dialect in ('mysql', 'mariadb'):
+            rows = connection.exec_driver_sql('EXPLAIN ' + audited.statement, audited.parameters).mappings().all()
+            audited.plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}"
+                            for row in rows]
+            audited.scans = [row['table'] for row in rows if row['type'] in ('ALL', 'index') and row['table'] in tables]
+            sorts = any('filesort' in (row['Extra'] or '') for row in rows)
+        else:
+            raise click.ClickException(f'EXPLAIN audit supports SQLite and MySQL, not {dialect}')
+        audited.bounded = bool(audited.scans) and bool(_LIMIT.search(audited.statement)) and not sorts
+
+
+# flask explain-audit: run it against a seeded database (benchmarks/seed.py) or a copy of
+# production, the planner's choices depend on the indexes and, on MySQL, the data
+@click.command('explain-audit')
+@click.option('--user-id', type=int, default=1, help='id the sweep authenticates as (with an admin claim)')
+@click.option('--allow-table', multiple=True, help='table whose full scans are acceptable (repeatable)')
+@click.option('-v', '--verbose', is_flag=True, help='print every statement with its plan')
+@with_appcontext
+def explain_audit(user_id, allow_table, verbose):
+    """EXPLAIN the queries of every blueprint route and report full table scans."""
+    statements, unexplored = sweep(current_app._get_current_object(), user_id)
+    for method, rule, endpoint, status in unexplored:
+        click.echo(f'[no queries, {status}] {method} {rule} ({endpoint})')
+    failures = []
+    for audited in statements:
+        scans = [table for table in audited.scans if table not in allow_table]
+        failing = bool(scans) and not audited.bounded
+        if failing:
+            failures.append(audited)
+        if failing or verbose:
+            verdict = 'FULL SCAN of ' + ', '.join(scans) if failing else 'ok'
+            click.echo(f"[{verdict}] {', '.join(sorted(audited.endpoints))}")
+            click.echo('  ' + statement_shape(audited.statement))
+            for line in audited.plan:
+                click.echo('    ' + line)
+    click.echo(f'{len(statements)} statements explained, {len(failures)} with full table scans, '
+               f'{len(unexplored)} route(s) answered 4xx without a query')
+    if failures:
+        raise SystemExit(1)
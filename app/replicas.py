@@ -0,0 +1,145 @@
+import itertools
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+# Optional read replicas, configured as extra binds named replica_0, replica_1, ...
+# Requests with a safe method read from one replica for their whole duration. Anything
+# that writes, and any client that wrote within the last REPLICA_PIN_SECONDS (tracked
+# with a cookie holding the pin's expiry), goes to the primary. So do views behind
+# etag_for/cached, see read_from_primary.
+class ReadReplicas:
+    def __init__(self):
+        self.keys = []
+        self.selection = 'round_robin'
+        self.pin_seconds = 5
+        self.cookie = 'recess_primary'
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    # Must run before db.init_app, the replicas are created with the other binds
+    def init_app(self, app):
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+        self.selection = app.config.get('REPLICA_SELECTION', 'round_robin')
+        self.pin_seconds = app.config.get('REPLICA_PIN_SECONDS', 5)
+        self.cookie = app.config.get('REPLICA_PIN_COOKIE', 'recess_primary')
+        if self.selection not in ('round_robin', 'least_connections'):
+            raise ValueError(f'Unknown REPLICA_SELECTION {self.selection!r}')
+
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        self.keys = []
+        for i, uri in enumerate(uris):
+            key = f'replica_{i}'
+            binds[key] = uri
+            self.keys.append(key)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+        if self.keys:
+            app.before_request(self._route_request)
+            app.after_request(self._pin_client)
+        app.extensions['read_replicas'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.keys)
+
+    def choose(self, engines):
+        if self.selection == 'least_connections':
+            return min(self.keys, key=lambda key: _checked_out(engines[key]))
+        with self._lock:
+            return self.keys[next(self._counter) % len(self.keys)]
+
+    def _route_request(self):
+        pinned_until = request.cookies.get(self.cookie)
+        try:
+            pinned = pinned_until is not None and float(pinned_until) > time.time()
+        except ValueError:
+            pinned = False
+        g.use_replica = request.method in SAFE_METHODS and not pinned
+
+    # A request that wrote pins its client to the primary long enough to read its own writes
+    def _pin_client(self, response):
+        if g.get('wrote_primary'):
+            expires = time.time() + self.pin_seconds
+            response.set_cookie(self.cookie, f'{expires:.3f}', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+# For views whose response is keyed by table versions (ETags, the response cache): the versions
+# come from commits on the primary, so the body must too. A lagging replica would pair an old
+# body with the new key, and that stays wrong until the next write bumps the version.
+def read_from_primary():
+    if has_request_context():
+        g.use_replica = False
+
+
+def _checked_out(engine):
+    checkedout = getattr(engine.pool, 'checkedout', None)
+    return checkedout() if checkedout is not None else 0
+
+
+read_replicas = ReadReplicas()
+
+
+# Sends reads to a replica when the request allows it, everything else to the normal bind
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            engines = self._db.engines
+            default = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+            # only tables on the primary bind have replicas
+            if default is engines.get(None):
+                key = self.info.get('replica')
+                if key is None:
+                    key = self.info['replica'] = read_replicas.choose(engines)
+                return engines[key]
+            return default
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    # In a transactional batch (app/batch.py) the views' commits only flush and a rollback
+    # fails the batch, which then commits or rolls back once at the end
+    def commit(self):
+        if self.info.get('deferred_commit'):
+            self.flush()
+            return
+        super().commit()
+
+    def rollback(self):
+        if self.info.get('deferred_commit'):
+            self.info['rolled_back'] = True
+        super().rollback()
+
+    def _reads_from_replica(self, clause):
+        return (
+            read_replicas.enabled
+            and has_request_context()
+            and g.get('use_replica', False)
+            and not self.info.get('wrote')
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        )
+
+
+def _mark_written(session):
+    session.info['wrote'] = True
+    session.info.pop('replica', None)
+    if has_request_context():
+        g.wrote_primary = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_after_flush(session, flush_context):
+    _mark_written(session)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _pin_before_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_written(orm_execute_state.session)
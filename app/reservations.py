@@ -0,0 +1,369 @@
+import atexit
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from app.database import begin_savepoint
+from app.extensions import db
+from app.models.merchandise import Merchandise
+from app.models.order import Order
+from app.models.orderitem import OrderItem
+from app.models.reservation import StockReservation
+from app.sharedmem import SharedCounters
+from app.versioning import table_versions
+
+# order statuses that turn the order's reservations into sold stock
+CONFIRMED_STATUSES = frozenset(('Paid', 'Shipped', 'Delivered', 'Completed'))
+PENDING_STATUS = 'Pending'
+CANCELLED_STATUS = 'Cancelled'
+EXPIRED_STATUS = 'Expired'
+# status changes allowed on an order, from -> to. Only Pending orders hold reservations, so
+# Cancelled and Expired orders, whose stock went back on sale, can't be paid for.
+ORDER_TRANSITIONS = {
+    'Pending': ('Paid', 'Cancelled'),
+    'Paid': ('Shipped', 'Cancelled'),
+    'Shipped': ('Delivered',),
+    'Delivered': ('Completed',)
+}
+
+
+# Shared-memory stock counters for a few very hot items (HOT_MERCHANDISE_IDS), for launches
+# where every buyer would otherwise queue on the same merchandise row lock. Stock is leased
+# from the row in blocks of HOT_STOCK_LEASE, with one conditional UPDATE committed on its
+# own connection, and then sold from a counter all the workers on the host share. Unsold
+# units are written back to the row later by flush(): at exit and from
+# `flask release-reservations`. With several hosts each one leases its own blocks, so
+# nothing is sold twice, the stock is only spread between them.
+class HotStock:
+    def __init__(self):
+        self.counters = None
+        self.slots = {}
+        self.lease_size = 50
+
+    def init_app(self, app):
+        ids = sorted(set(app.config.get('HOT_MERCHANDISE_IDS') or ()))
+        self.lease_size = app.config.get('HOT_STOCK_LEASE', 50)
+        self.slots = {merchandise_id: i for i, merchandise_id in enumerate(ids)}
+        self.counters = None
+        if ids:
+            key = hashlib.blake2b(','.join(map(str, ids)).encode('utf-8'), digest_size=4).hexdigest()
+            directory = app.config.get('HOT_STOCK_DIR') or app.instance_path
+            self.counters = SharedCounters(os.path.join(directory, f'hot_stock-{key}.bin'), len(ids))
+
+    def handles(self, merchandise_id):
+        return self.counters is not None and merchandise_id in self.slots
+
+    def available(self, merchandise_id):
+        return self.counters.get(self.slots[merchandise_id])
+
+    def take(self, merchandise_id, quantity):
+        return self.counters.take(self.slots[merchandise_id], quantity,
+                                  lambda missing: self._lease(merchandise_id, max(missing, self.lease_size)))
+
+    def give_back(self, merchandise_id, quantity):
+        self.counters.incr(self.slots[merchandise_id], quantity)
+
+    # Moves up to `wanted` units from the row into the counter, a few tries when racing
+    # other hosts (or a restock) between the read and the conditional update
+    def _lease(self, merchandise_id, wanted):
+        table = Merchandise.__table__
+        for _ in range(3):
+            with db.engine.begin() as conn:
+                stock = conn.execute(db.select(table.c.stock).where(table.c.id == merchandise_id)).scalar() or 0
+                amount = min(wanted, stock)
+                if amount <= 0:
+                    return 0
+                result = conn.execute(table.update().where(table.c.id == merchandise_id, table.c.stock >= amount)
+                                      .values(stock=table.c.stock - amount))
+            if result.rowcount:
+                _bump_merchandise()
+                return amount
+        return 0
+
+    # Write the unsold leased units back to their rows
+    def flush(self):
+        returned = 0
+        table = Merchandise.__table__
+        for merchandise_id, slot in self.slots.items():
+            amount = self.counters.swap(slot, 0)
+            if not amount:
+                continue
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(table.update().where(table.c.id == merchandise_id)
+                                 .values(stock=table.c.stock + amount))
+            except Exception:
+                self.counters.incr(slot, amount)
+                raise
+            returned += amount
+        if returned:
+            _bump_merchandise()
+        return returned
+
+
+# these writes commit outside the session, so the versioning listeners don't see them
+def _bump_merchandise():
+    if table_versions.counters is not None:
+        table_versions.bump((Merchandise.__tablename__,))
+
+
+# Stock reservations for the order path. reserve() takes stock with conditional decrements
+# (UPDATE ... SET stock = stock - q WHERE stock >= q), so concurrent buyers can't oversell
+# and never hold a lock across a read-modify-write. Each reservation expires after
+# RESERVATION_TTL seconds unless its order is confirmed (paid); release_expired() then
+# returns the stock and marks the order Expired. Every release claims its rows with a
+# conditional DELETE/UPDATE first, so two releases racing can't both return the same units.
+class StockReservations:
+    def __init__(self):
+        self.ttl = 900
+        self.hot = HotStock()
+        self._app = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get('RESERVATION_TTL', 900)
+        self.hot.init_app(app)
+        if self.hot.counters is not None and self._app is None:
+            atexit.register(self._flush_at_exit)
+        self._app = app
+        app.extensions['stock_reservations'] = self
+
+    def _flush_at_exit(self):
+        with self._app.app_context():
+            self.hot.flush()
+
+    # Takes {merchandise_id: quantity} out of stock within the current transaction and returns
+    # the ids that were short. When any is, nothing is taken: the decrement runs in a savepoint,
+    # so the rest of the caller's transaction is left as it was.
+    def reserve(self, quantities):
+        session = db.session
+        taken = []
+        short = []
+        # hot items first: their leases commit on another connection and must not queue
+        # behind row locks this transaction is about to take
+        for merchandise_id in sorted(quantities):
+            if self.hot.handles(merchandise_id):
+                if self.hot.take(merchandise_id, quantities[merchandise_id]):
+                    taken.append((merchandise_id, quantities[merchandise_id]))
+                else:
+                    short.append(merchandise_id)
+        rows = {merchandise_id: quantity for merchandise_id, quantity in quantities.items()
+                if not self.hot.handles(merchandise_id)}
+        wanted = db.case(rows, value=Merchandise.id)
+        if rows and not short:
+            # the whole cart in one statement; it walks the primary key in order, so two carts
+            # sharing items lock them in the same order and can't deadlock. A partly applied update is
+            # undone through a savepoint, never by rolling back the caller's transaction; a single row
+            # is updated whole or not at all, so it needs none
+            savepoint = begin_savepoint(session) if len(rows) > 1 else None
+            result = session.execute(
+                db.update(Merchandise)
+                .where(Merchandise.id.in_(rows), Merchandise.stock >= wanted)
+                .values(stock=Merchandise.stock - wanted)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == len(rows):
+                if savepoint is not None:
+                    savepoint.commit()
+            else:
+                if savepoint is not None:
+                    savepoint.rollback()
+                # which rows were short, now the update is undone; a sale racing this read may hide them
+                short.extend(session.execute(
+                    db.select(Merchandise.id).where(Merchandise.id.in_(rows), Merchandise.stock < wanted)
+                ).scalars().all() or rows)
+        elif rows:
+            short.extend(session.execute(
+                db.select(Merchandise.id).where(Merchandise.id.in_(rows), Merchandise.stock < wanted)
+            ).scalars())
+        if short:
+            for merchandise_id, quantity in taken:
+                self.hot.give_back(merchandise_id, quantity)
+            return sorted(set(short))
+        # given back by the after_rollback listener if the caller's transaction fails
+        session.info.setdefault('hot_taken', []).extend(taken)
+        return []
+
+    # Reservation rows for what reserve() took, in the same transaction
+    def record(self, order_id, quantities):
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        db.session.execute(db.insert(StockReservation), [{
+            "order_id": order_id, "merchandise_id": merchandise_id, "quantity": quantity, "expires_at": expires_at
+        } for merchandise_id, quantity in quantities.items()])
+
+    # Returns what the order still holds: everything, or up to `quantity` of one item.
+    # Gives the number of units released.
+    def release(self, order_id, merchandise_id=None, quantity=None):
+        session = db.session
+        query = db.select(StockReservation.id, StockReservation.merchandise_id, StockReservation.quantity) \
+            .where(StockReservation.order_id == order_id)
+        if merchandise_id is not None:
+            query = query.where(StockReservation.merchandise_id == merchandise_id)
+        remaining = quantity
+        restock = {}
+        for reservation_id, reserved_id, reserved in session.execute(query.order_by(StockReservation.id.desc())).all():
+            if remaining is not None and remaining <= 0:
+                break
+            amount = reserved if remaining is None else min(reserved, remaining)
+            if amount == reserved:
+                statement = db.delete(StockReservation).where(StockReservation.id == reservation_id)
+            else:
+                statement = db.update(StockReservation) \
+                    .where(StockReservation.id == reservation_id, StockReservation.quantity >= amount) \
+                    .values(quantity=StockReservation.quantity - amount)
+            if session.execute(statement.execution_options(synchronize_session=False)).rowcount:
+                restock[reserved_id] = restock.get(reserved_id, 0) + amount
+                if remaining is not None:
+                    remaining -= amount
+        self._restock(restock)
+        return sum(restock.values())
+
+    def _restock(self, amounts):
+        session = db.session
+        rows = {}
+        for merchandise_id, amount in amounts.items():
+            if self.hot.handles(merchandise_id):
+                # into the counter once the transaction commits
+                session.info.setdefault('hot_released', []).append((merchandise_id, amount))
+            else:
+                rows[merchandise_id] = amount
+        if rows:
+            session.execute(
+                db.update(Merchandise).where(Merchandise.id.in_(rows))
+                .values(stock=Merchandise.stock + db.case(rows, value=Merchandise.id))
+                .execution_options(synchronize_session=False)
+            )
+
+    # The order was paid: its reserved stock is sold
+    def confirm(self, order_id):
+        return self.confirm_orders([order_id])
+
+    # Items the orders' reservations don't cover (placed before reservations existed, or
+    # released since) take their stock now with reserve(), and stock reserved beyond the items
+    # goes back. Returns the merchandise ids that were short; nothing is confirmed then.
+    def confirm_orders(self, order_ids):
+        session = db.session
+        held = session.execute(
+            db.select(StockReservation.id, StockReservation.merchandise_id, StockReservation.quantity)
+            .where(StockReservation.order_id.in_(order_ids)).with_for_update()
+        ).all()
+        balance = dict(session.execute(
+            db.select(OrderItem.merchandise_id, db.func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(order_ids)).group_by(OrderItem.merchandise_id)
+        ).all())
+        for row in held:
+            balance[row.merchandise_id] = balance.get(row.merchandise_id, 0) - row.quantity
+        missing = {merchandise_id: amount for merchandise_id, amount in balance.items() if amount > 0}
+        if missing:
+            short = self.reserve(missing)
+            if short:
+                return short
+        if held:
+            claimed = session.execute(
+                db.delete(StockReservation).where(StockReservation.id.in_([row.id for row in held]))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed != len(held):
+                raise RuntimeError("Reservations were released concurrently, try again")
+        self._restock({merchandise_id: -amount for merchandise_id, amount in balance.items() if amount < 0})
+        return []
+
+    # A confirmed order holds no reservations, its items are sold: cancelling it puts their
+    # quantities back in stock. Like release_orders(), the caller must already hold the orders'
+    # rows (moved them out of the confirmed status in this transaction).
+    def restock_orders(self, order_ids):
+        amounts = dict(db.session.execute(
+            db.select(OrderItem.merchandise_id, db.func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(order_ids)).group_by(OrderItem.merchandise_id)
+        ).all())
+        self._restock(amounts)
+        return sum(amounts.values())
+
+    # release() for many orders in a fixed number of statements. The caller must already hold
+    # the orders' rows (updated them in this transaction), so no other release can claim these
+    # reservations between the SELECT and the DELETE; should one have, nothing is released.
+    def release_orders(self, order_ids):
+        session = db.session
+        rows = session.execute(
+            db.select(StockReservation.id, StockReservation.merchandise_id, StockReservation.quantity)
+            .where(StockReservation.order_id.in_(order_ids)).with_for_update()
+        ).all()
+        if not rows:
+            return 0
+        claimed = session.execute(
+            db.delete(StockReservation).where(StockReservation.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(rows):
+            raise RuntimeError("Reservations were released concurrently, try again")
+        restock = {}
+        for row in rows:
+            restock[row.merchandise_id] = restock.get(row.merchandise_id, 0) + row.quantity
+        self._restock(restock)
+        return sum(restock.values())
+
+    # Marks the Pending orders holding reservations past their TTL (optionally only those
+    # holding one of `merchandise_ids`) as Expired and releases them. Orders paid meanwhile keep
+    # their stock: each order is only released once its conditional move to Expired went
+    # through. Commits; returns the number of orders released.
+    def release_expired(self, merchandise_ids=None, limit=500):
+        session = db.session
+        query = db.select(StockReservation.order_id) \
+            .join(Order, Order.id == StockReservation.order_id) \
+            .where(StockReservation.expires_at <= datetime.utcnow(), Order.status_of_order == PENDING_STATUS)
+        if merchandise_ids:
+            query = query.where(StockReservation.merchandise_id.in_(merchandise_ids))
+        order_ids = list(session.execute(query.distinct().limit(limit)).scalars())
+        if not order_ids:
+            return 0
+        released = 0
+        try:
+            for order_id in order_ids:
+                expired = session.execute(
+                    db.update(Order).where(Order.id == order_id, Order.status_of_order == PENDING_STATUS)
+                    .values(status_of_order=EXPIRED_STATUS).execution_options(synchronize_session=False)
+                ).rowcount
+                if expired:
+                    self.release(order_id)
+                    released += 1
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return released
+
+
+stock_reservations = StockReservations()
+
+
+# Hot counter units only move once the transaction's outcome is known
+@event.listens_for(db.session, 'after_commit')
+def _settle_hot_stock(session):
+    session.info.pop('hot_taken', None)
+    for merchandise_id, quantity in session.info.pop('hot_released', ()):
+        stock_reservations.hot.give_back(merchandise_id, quantity)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _return_hot_stock(session):
+    session.info.pop('hot_released', None)
+    for merchandise_id, quantity in session.info.pop('hot_taken', ()):
+        stock_reservations.hot.give_back(merchandise_id, quantity)
+
+
+# flask release-reservations: run from cron every minute or so
+@click.command('release-reservations')
+@with_appcontext
+def release_reservations():
+    """Return the stock of expired reservations and write back unsold hot-item leases."""
+    released = 0
+    while True:
+        count = stock_reservations.release_expired()
+        released += count
+        if not count:
+            break
+    returned = stock_reservations.hot.flush() if stock_reservations.hot.counters is not None else 0
+    click.echo(f'released {released} expired order(s), returned {returned} leased hot-item unit(s)')
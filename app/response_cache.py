@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from app.extensions import db
+from app.replicas import read_from_primary
+from app.versioning import table_versions
+
+
+class CacheEntry:
+    __slots__ = ('body', 'status', 'mimetype', 'tags', 'versions', 'expires_at', 'size', 'encoded')
+
+    def __init__(self, body, status, mimetype, tags, versions, expires_at):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.tags = tags
+        self.versions = versions
+        self.expires_at = expires_at
+        self.size = len(body)
+        # compressed copies of body by content coding, filled in by app.compression
+        self.encoded = {}
+
+
+# LRU + TTL cache of rendered GET responses, capped by total body size.
+# Entries are tagged with the tables they read. A local commit purges the tag right away,
+# and every hit re-checks the shared table versions, so writes made by other worker
+# processes invalidate entries here as well.
+class ResponseCache:
+    def __init__(self):
+        self.enabled = False
+        self.ttl = 300
+        self.max_bytes = 32 * 1024 * 1024
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 300)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        table_versions.on_commit(self.purge_tags)
+        app.extensions['response_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic() or entry.versions != table_versions.snapshot(entry.tags):
+                self._remove(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        # one response may not take more than a quarter of the cache
+        if entry.size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += entry.size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    # Keep a compressed copy of a cached body, if the entry is still the one cached under key
+    def add_encoding(self, key, entry, encoding, data):
+        with self._lock:
+            if self._entries.get(key) is not entry or encoding in entry.encoded:
+                return
+            entry.encoded[encoding] = data
+            entry.size += len(data)
+            self._size += len(data)
+            while self._size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def purge_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.pop(tag, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key():
+    return (request.path, tuple(sorted(request.args.items(multi=True))), request.headers.get('Accept', ''))
+
+
+# Serve the view from the response cache, keyed by path, query string and Accept header.
+# `tables` are the tables the view reads.
+def cached(*tables):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # uncommitted writes in this session (a transactional batch) make both the
+            # cached body and the table versions unreliable
+            if not response_cache.enabled or db.session.info.get('touched_tables'):
+                return fn(*args, **kwargs)
+
+            key = _cache_key()
+            entry = response_cache.get(key)
+            if entry is not None:
+                response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+                response.vary.add('Accept')
+                response.headers['X-Cache'] = 'HIT'
+                response.cache_entry = (key, entry)
+                return response
+
+            # versions are read before the view runs, so a write racing the query
+            # leaves an entry that is already stale rather than one that looks fresh
+            versions = table_versions.snapshot(tables)
+            read_from_primary()
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                entry = CacheEntry(
+                    response.get_data(), response.status_code, response.mimetype,
+                    tables, versions, time.monotonic() + response_cache.ttl
+                )
+                response_cache.set(key, entry)
+                response.cache_entry = (key, entry)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
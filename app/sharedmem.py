@@ -0,0 +1,79 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+SLOT = struct.Struct('<Q')
+
+
+# Fixed-size array of unsigned 64-bit counters in a memory-mapped file, so every worker
+# process on the host sees the same values. Reads are plain memory reads, writes take
+# a thread lock plus an fcntl lock on the file (fcntl locks only exclude other processes).
+class SharedCounters:
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * SLOT.size
+        with self.locked():
+            self.created = os.fstat(self._fd).st_size == 0
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def get(self, slot):
+        return SLOT.unpack_from(self._map, slot * SLOT.size)[0]
+
+    def set(self, slot, value):
+        with self.locked():
+            SLOT.pack_into(self._map, slot * SLOT.size, value)
+
+    # For callers already holding locked(), to update several slots in one critical section
+    def store(self, slot, value):
+        SLOT.pack_into(self._map, slot * SLOT.size, value)
+
+    def incr(self, slot, amount=1):
+        with self.locked():
+            value = (SLOT.unpack_from(self._map, slot * SLOT.size)[0] + amount) & 0xFFFFFFFFFFFFFFFF
+            SLOT.pack_into(self._map, slot * SLOT.size, value)
+        return value
+
+    # Atomically subtract `amount` if the slot holds at least that much. When it doesn't,
+    # `refill(missing)` runs under the lock and returns how much to add first.
+    def take(self, slot, amount, refill=None):
+        with self.locked():
+            value = SLOT.unpack_from(self._map, slot * SLOT.size)[0]
+            if value < amount and refill is not None:
+                value += refill(amount - value)
+            taken = value >= amount
+            if taken:
+                value -= amount
+            SLOT.pack_into(self._map, slot * SLOT.size, value)
+        return taken
+
+    # Set the slot and return what it held, atomically
+    def swap(self, slot, value):
+        with self.locked():
+            previous = SLOT.unpack_from(self._map, slot * SLOT.size)[0]
+            SLOT.pack_into(self._map, slot * SLOT.size, value)
+        return previous
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
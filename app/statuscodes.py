@@ -7,3 +7,5 @@ HTTP_404_NOT_FOUND=404
 HTTP_404_NOT_FOUND=404
 HTTP_500_INTERNAL_SERVER_ERROR=500
 HTTP_409_CONFLICT=409
+HTTP_429_TOO_MANY_REQUESTS=429
+HTTP_424_FAILED_DEPENDENCY=424
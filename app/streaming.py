@@ -0,0 +1,49 @@
+from flask import Response, current_app, request, stream_with_context
+
+from app.extensions import db
+from app.pagination import int_arg, requested_fields
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+# Streaming is requested with ?stream=1 or an Accept: application/x-ndjson header
+def wants_stream():
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+# Stream a whole table without holding it in memory. Rows are read in batches of
+# STREAM_BATCH_SIZE through a server-side cursor and written out as soon as they are encoded.
+# NDJSON emits one object per line, otherwise the body is a chunked {"<key>": [...]} document.
+def stream_rows(model, serializer, key):
+    keys = requested_fields(serializer)
+    after = int_arg('after')
+    batch_size = current_app.config.get('STREAM_BATCH_SIZE', 1000)
+
+    query = db.select(*[getattr(model, name) for name in serializer.columns(keys)]).order_by(model.id)
+    if after is not None:
+        query = query.where(model.id > after)
+    query = query.execution_options(yield_per=batch_size, stream_results=True)
+
+    render = serializer.compiled(keys)
+    dumps = current_app.json.dumps
+    ndjson = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+    def generate():
+        result = db.session.execute(query)
+        if ndjson:
+            for partition in result.partitions():
+                yield ''.join(dumps(render(row)) + '\n' for row in partition)
+        else:
+            yield '{"%s": [' % key
+            first = True
+            for partition in result.partitions():
+                chunk = ','.join(dumps(render(row)) for row in partition)
+                yield chunk if first else ',' + chunk
+                first = False
+            yield ']}'
+        result.close()
+
+    mimetype = NDJSON_MIMETYPE if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+
+from app.extensions import db
+from app.replicas import read_from_primary
+from app.sharedmem import SharedCounters
+
+
+# One version counter per table, bumped whenever a commit wrote to that table.
+# Slot 0 holds a random epoch written when the counter file is created, so ETags
+# issued before the file was reset can never match again. The counters live in a file
+# the worker processes of one host share: writes made through another host don't bump them.
+class TableVersions:
+    def __init__(self):
+        self.counters = None
+        self.slots = {}
+        self.listeners = []
+
+    def init_app(self, app):
+        tables = sorted(db.metadata.tables)
+        # the slot layout depends on the table list, so a schema change starts a fresh file
+        layout = hashlib.blake2b(','.join(tables).encode('utf-8'), digest_size=4).hexdigest()
+        directory = app.config.get('TABLE_VERSIONS_DIR') or app.instance_path
+        path = os.path.join(directory, f'table_versions-{layout}.bin')
+        self.slots = {name: i + 1 for i, name in enumerate(tables)}
+        self.counters = SharedCounters(path, len(tables) + 1)
+        if self.counters.get(0) == 0:
+            self.counters.set(0, int.from_bytes(os.urandom(8), 'little') | 1)
+        app.extensions['table_versions'] = self
+
+    def get(self, table):
+        return self.counters.get(self.slots[table])
+
+    def bump(self, tables):
+        for table in tables:
+            slot = self.slots.get(table)
+            if slot is not None:
+                self.counters.incr(slot)
+        for listener in self.listeners:
+            listener(tables)
+
+    # Called with the set of table names after every commit that wrote to them
+    def on_commit(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+        return listener
+
+    def snapshot(self, tables):
+        return tuple(self.get(table) for table in tables)
+
+    # Strong ETag for the current version of `tables`, specific to the negotiated representation
+    def etag(self, tables):
+        parts = [str(self.counters.get(0))]
+        parts.extend(f'{table}:{self.get(table)}' for table in tables)
+        parts.append(request.headers.get('Accept', ''))
+        parts.append(request.headers.get('Accept-Encoding', ''))
+        return hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+table_versions = TableVersions()
+
+
+def _touched(session):
+    return session.info.setdefault('touched_tables', set())
+
+
+# Unit-of-work writes
+@event.listens_for(db.session, 'after_flush')
+def _record_flushed_tables(session, flush_context):
+    touched = _touched(session)
+    for obj in session.new | session.dirty | session.deleted:
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            touched.add(table)
+
+
+# Bulk insert/update/delete statements executed through the session
+@event.listens_for(db.session, 'do_orm_execute')
+def _record_executed_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _touched(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_committed_tables(session):
+    touched = session.info.pop('touched_tables', None)
+    if touched and table_versions.counters is not None:
+        table_versions.bump(touched)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_rolled_back_tables(session):
+    session.info.pop('touched_tables', None)
+
+
+# Answers If-None-Match with a 304 before the view runs any query.
+# The version is read before the view so a concurrent write can only make the ETag stale-early.
+def etag_for(*tables):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # the versions don't cover this session's own uncommitted writes
+            if db.session.info.get('touched_tables'):
+                return fn(*args, **kwargs)
+            etag = table_versions.etag(tables)
+            read_from_primary()
+            # the ETag depends on both headers, so caches must key on both, the 304 included
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                response.vary.update(('Accept', 'Accept-Encoding'))
+                return response
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.vary.update(('Accept', 'Accept-Encoding'))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,76 @@
+# Role checks: admin requests resolve the role from the token claim, without a `users` lookup,
+# until a write to `users` in any worker process makes the claim stale.
+#
+#   python benchmarks/bench_auth.py --requests 500
+import argparse
+import sys
+import time
+
+from common import make_app, create_user
+
+
+def users_lookups(shapes):
+    return sum(count for shape, count in shapes.items() if shape.startswith('SELECT users.user_type'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    app = make_app(BCRYPT_LOG_ROUNDS=4, RESPONSE_CACHE_ENABLED=False)
+    admin_id = create_user(app, 'admin@example.com', 'benchpassword', user_type='admin')
+
+    from app.instrumentation import current_sql_stats
+
+    # statement shapes of the last request, from app/instrumentation.py
+    @app.after_request
+    def keep_shapes(response):
+        app.last_shapes = dict(current_sql_stats().shapes)
+        return response
+
+    client = app.test_client()
+    token = client.post('/api/v1/user/login', json={"email": "admin@example.com", "password": "benchpassword"}) \
+        .get_json()['access_token']
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"ids": [1000000], "from": "Paid", "to": "Shipped"}
+
+    def admin_request():
+        return client.post('/api/v1/orders/bulk/status', json=body, headers=headers).status_code
+
+    failures = []
+    status = admin_request()
+    if status != 200 or users_lookups(app.last_shapes):
+        failures.append(f"admin request with a current claim: status {status}, "
+                        f"{users_lookups(app.last_shapes)} users lookup(s), expected 200 and none")
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        admin_request()
+    elapsed = time.perf_counter() - start
+    print(f"admin requests, role from the claim: {args.requests / elapsed:8.1f} req/s, "
+          f"{sum(app.last_shapes.values())} statement(s) per request")
+
+    # another worker process demotes the admin: nothing calls user_cache.invalidate here,
+    # only the commit's bump of the shared `users` version tells this process
+    from app.extensions import db
+    from app.models.user import User
+    from app.versioning import table_versions
+    with app.app_context():
+        db.session.execute(db.update(User).where(User.id == admin_id).values(user_type='user'))
+        db.session.commit()
+    if 'users' not in table_versions.slots:
+        failures.append("users table has no shared version")
+    status = admin_request()
+    if status != 400 or users_lookups(app.last_shapes) != 1:
+        failures.append(f"admin request after demotion: status {status}, "
+                        f"{users_lookups(app.last_shapes)} users lookup(s), expected 400 and one")
+
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+    print("ok: no users lookup while the claim is current, demotion seen on the next request")
+
+
+if __name__ == '__main__':
+    main()
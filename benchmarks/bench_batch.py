@@ -0,0 +1,88 @@
+# App launch as the mobile client does it: the same six GET calls sent one by one and as a
+# single /api/v1/batch request, against the small seeded dataset. Runs in-process, so the
+# gain shown is the per-request overhead (hooks, JWT checks, connection checkout) only;
+# over a real network each saved round trip also saves its latency.
+#
+#   python benchmarks/bench_batch.py --iterations 200
+import argparse
+import logging
+import statistics
+import time
+
+from common import make_app
+from seed import ADMIN_EMAIL, BENCH_PASSWORD, PRESETS, seed
+
+LAUNCH_CALLS = [
+    '/api/v1/squad/squads?limit=20',
+    '/api/v1/merchandise/merchandise?limit=20',
+    '/api/v1/donation/?limit=20',
+    '/api/v1/user/user/1',
+    '/api/v1/playerstatistics/playerstatistics?limit=20',
+    '/api/v1/playerstatistics/squad/1'
+]
+
+
+def timed(fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000, sum(latencies)
+
+
+# A failed sub-request must not leave changes behind for the next one's commit to save
+def check_failed_subrequest_persists_nothing(app, client, headers):
+    from app.extensions import db
+    from app.models.user import User
+
+    with app.app_context():
+        before = db.session.get(User, 1).first_name
+    response = client.post('/api/v1/batch', headers=headers, json={"requests": [
+        {"method": "PATCH", "path": "/api/v1/user/edit/1", "body": {"first_name": "Changed", "email": "not-an-email"}},
+        {"method": "POST", "path": "/api/v1/contacts/create",
+         "body": {"name": "Bench fan", "email": "batch-check@example.com", "message": "Season tickets?"}}
+    ]})
+    statuses = [item['status'] for item in response.get_json()['responses']]
+    assert statuses[0] == 400 and statuses[1] < 300, statuses
+    with app.app_context():
+        after = db.session.get(User, 1).first_name
+    assert after == before, f'failed sub-request persisted first_name={after!r}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    args = parser.parse_args()
+
+    logging.getLogger('app.sql').setLevel(logging.ERROR)
+    app = make_app(RESPONSE_CACHE_ENABLED=not args.no_cache)
+    seed(app, PRESETS['small'], 10000, log=lambda line: None)
+    client = app.test_client()
+    token = client.post('/api/v1/user/login', json={"email": ADMIN_EMAIL, "password": BENCH_PASSWORD}).get_json()['access_token']
+    headers = {'Authorization': 'Bearer ' + token}
+    check_failed_subrequest_persists_nothing(app, client, headers)
+
+    def one_by_one():
+        for path in LAUNCH_CALLS:
+            assert client.get(path, headers=headers).status_code == 200, path
+
+    batch_body = {"requests": [{"path": path} for path in LAUNCH_CALLS]}
+
+    def batched():
+        response = client.post('/api/v1/batch', json=batch_body, headers=headers)
+        assert all(item['status'] == 200 for item in response.get_json()['responses'])
+
+    one_by_one()
+    batched()
+    separate_ms, separate_total = timed(one_by_one, args.iterations)
+    batch_ms, batch_total = timed(batched, args.iterations)
+    print(f'{len(LAUNCH_CALLS)} calls, {args.iterations} launches, median per launch')
+    print(f'separate requests: {separate_ms:8.2f} ms  {args.iterations / separate_total:7.1f} launches/s')
+    print(f'one batch        : {batch_ms:8.2f} ms  {args.iterations / batch_total:7.1f} launches/s'
+          f'  ({separate_ms / batch_ms:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
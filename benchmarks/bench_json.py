@@ -0,0 +1,64 @@
+# Encode throughput for the big list payloads: Flask's default provider vs FastJSONProvider,
+# plus MessagePack when it is installed.
+#
+#   python benchmarks/bench_json.py --rows 10000
+import argparse
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from common import make_app
+
+
+def payloads(rows):
+    squads = [{
+        "id": i, "first_name": "First", "last_name": "Last", "position": "Wing", "jersey_number": str(i),
+        "biography": "Biography " * 10, "image": "data:image/png;base64," + "A" * 200,
+        "weight": Decimal("80.50"), "height": Decimal("1.85"), "date_of_birth": date(1995, 5, 17)
+    } for i in range(rows)]
+    users = [{
+        "id": i, "first_name": "First", "last_name": "Last", "contact": str(i), "email": f"user{i}@example.com",
+        "join_date": datetime(2024, 1, 1), "membership_status": "Active", "user_type": "user"
+    } for i in range(rows)]
+    donations = [{
+        "id": i, "amount": 10.5, "message": "Up the club", "date": "2024-01-01", "user_id": i,
+        "name": f"Donor {i}", "contact": "0700000000"
+    } for i in range(rows)]
+    return {"squads": squads, "users": users, "donations": donations}
+
+
+def throughput(fn, obj, repeat=3):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn(obj))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return size / best / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    from flask.json.provider import DefaultJSONProvider
+    from app.json_provider import FastJSONProvider, _default, msgpack
+
+    app = make_app()
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    print(f"{'payload':>10} {'default MiB/s':>14} {'fast MiB/s':>11} {'msgpack MiB/s':>14}")
+    for name, rows in payloads(args.rows).items():
+        obj = {name: rows}
+        old = throughput(lambda o: default.dumps(o, separators=(',', ':')), obj)
+        new = throughput(fast.dumps, obj)
+        packed = throughput(lambda o: msgpack.packb(o, default=_default), obj) if msgpack else None
+        packed_str = f"{packed:>14.1f}" if packed is not None else f"{'n/a':>14}"
+        print(f"{name:>10} {old:>14.1f} {new:>11.1f} {packed_str}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# Logins per second at different hashing pool sizes.
+#
+#   python benchmarks/bench_login.py --pool-sizes 0,1,2,4 --logins 200 --clients 8
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_app, create_user
+
+
+def run(pool_size, logins, clients, rounds):
+    app = make_app(BCRYPT_POOL_SIZE=pool_size, BCRYPT_QUEUE_SIZE=clients, BCRYPT_LOG_ROUNDS=rounds)
+    create_user(app, 'bench@example.com', 'benchpassword')
+    body = {"email": "bench@example.com", "password": "benchpassword"}
+
+    def login(_):
+        return app.test_client().post('/api/v1/user/login', json=body).status_code
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        start = time.perf_counter()
+        statuses = list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+
+    from app.extensions import bcrypt
+    bcrypt.shutdown()
+    return logins / elapsed, statuses.count(200), statuses.count(429)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pool-sizes', default='0,1,2,4')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'pool':>6} {'logins/s':>10} {'ok':>6} {'429':>6}")
+    for size in (int(s) for s in args.pool_sizes.split(',')):
+        rate, ok, busy = run(size, args.logins, args.clients, args.rounds)
+        print(f"{size:>6} {rate:>10.1f} {ok:>6} {busy:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Requests per second for the roster page (/api/v1/squad/squads) with the response cache
+# off and warm.
+#
+#   python benchmarks/bench_response_cache.py --squads 60 --requests 2000
+import argparse
+import time
+
+from common import make_app, create_user
+
+
+def seed(app, squads):
+    from app.extensions import db
+    from app.models.squad import Squad
+
+    with app.app_context():
+        db.session.execute(db.insert(Squad), [{
+            "first_name": "First", "last_name": f"Last {i}", "position": "Wing", "jersey_number": str(i),
+            "biography": "Biography " * 20, "image": "data:image/png;base64," + "A" * 2000,
+            "weight": 90.5, "height": 1.85
+        } for i in range(squads)])
+        db.session.commit()
+
+
+def run(enabled, squads, requests):
+    app = make_app(RESPONSE_CACHE_ENABLED=enabled)
+    create_user(app, f'bench{int(enabled)}@example.com', 'benchpassword', user_type='admin')
+    seed(app, squads)
+    client = app.test_client()
+    token = client.post('/api/v1/user/login', json={
+        "email": f'bench{int(enabled)}@example.com', "password": "benchpassword"
+    }).get_json()['access_token']
+    headers = {'Authorization': 'Bearer ' + token}
+
+    client.get('/api/v1/squad/squads', headers=headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/v1/squad/squads', headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--squads', type=int, default=60)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    cold = run(False, args.squads, args.requests)
+    warm = run(True, args.squads, args.requests)
+    print(f"cache off: {cold:8.1f} req/s")
+    print(f"warm     : {warm:8.1f} req/s  ({warm / cold:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
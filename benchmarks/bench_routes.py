@@ -0,0 +1,415 @@
+# p50/p95/p99 latency and throughput for every route of every blueprint, against a seeded
+# dataset, compared with a stored baseline. Exits non-zero when a route regressed.
+#
+#   python benchmarks/bench_routes.py                                   # small preset, temp DB
+#   python benchmarks/bench_routes.py --db /tmp/recess-large.db --skip-seed --requests 500
+#   python benchmarks/bench_routes.py --save-baseline                   # record a new baseline
+#
+# Baselines are only comparable on the same machine, preset and request count; re-record
+# one with --save-baseline after an intentional change.
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from common import make_app
+from seed import ADMIN_EMAIL, USER_EMAIL, BENCH_PASSWORD, add_volume_arguments, seed, volumes_from_args
+
+BULK_ROWS = 100
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Route:
+    def __init__(self, endpoint, method, path, auth=None, body=None, prepare=None, requests=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.auth = auth
+        self.body = body
+        self.prepare = prepare
+        self.requests = requests
+
+    @property
+    def key(self):
+        return f'{self.method} {self.endpoint}'
+
+
+class Context:
+    def __init__(self, app, client, rng, tag):
+        self.app = app
+        self.client = client
+        self.rng = rng
+        self.tag = tag
+        self.max_id = {}
+        self.tokens = {}
+        self.targets = []
+        self.sequence = itertools.count()
+
+    def some_id(self, table):
+        return self.rng.randint(1, self.max_id[table])
+
+
+def fixed(path):
+    return lambda ctx, i: path
+
+
+def random_id(template, table):
+    return lambda ctx, i: template.format(id=ctx.some_id(table))
+
+
+def target(template):
+    return lambda ctx, i: template.format(id=ctx.targets[i])
+
+
+# Insert `n` throwaway rows for the destructive routes and return their ids
+def fresh(model_path, make_row):
+    def prepare(ctx, n):
+        from app.extensions import db
+        module, name = model_path.rsplit('.', 1)
+        model = getattr(__import__(module, fromlist=[name]), name)
+        ids = []
+        with ctx.app.app_context(), db.engine.begin() as conn:
+            for i in range(n):
+                ids.append(conn.execute(model.__table__.insert(), make_row(ctx, i)).inserted_primary_key[0])
+        return ids
+    return prepare
+
+
+def _squad_row(ctx, i):
+    return {"first_name": "Temp", "last_name": "Player", "position": "Wing", "jersey_number": f"T{ctx.tag}-{next(ctx.sequence)}",
+            "biography": "Trialist", "image": "img"}
+
+
+def _squads_with_statistics(ctx, n):
+    from app.extensions import db
+    from app.models.playerstatistics import PlayerStatistic
+
+    squad_ids = fresh('app.models.squad.Squad', _squad_row)(ctx, n)
+    with ctx.app.app_context(), db.engine.begin() as conn:
+        conn.execute(PlayerStatistic.__table__.insert(), [{
+            "squad_id": squad_id, "matches_played": 1, "tries_scored": 0, "conversions": 0, "penalties": 0,
+            "yellow_cards": 0, "red_cards": 0, "minutes_played": 80
+        } for squad_id in squad_ids])
+    return squad_ids
+
+
+def _user_order_row(ctx, i):
+    return {"user_id": 2, "order_date": datetime(2024, 1, 1), "status_of_order": "Pending",
+            "address_of_delivery": "1 Stadium Road"}
+
+
+# A fresh Pending order of the bench user per request with one item, whose items can still change
+def _pending_order_items(ctx, n):
+    order_ids = fresh('app.models.order.Order', lambda ctx, i: dict(_user_order_row(ctx, i), order_total=1, item_count=1))(ctx, n)
+    return fresh('app.models.orderitem.OrderItem', lambda ctx, i: {
+        "order_id": order_ids[i], "merchandise_id": 1, "quantity": 1, "price_of_item": 1, "total_amount": 1})(ctx, n)
+
+
+# BULK_ROWS fresh Paid orders per request, for the bulk status change
+def _paid_order_batches(ctx, n):
+    ids = fresh('app.models.order.Order', lambda ctx, i: dict(_user_order_row(ctx, i), status_of_order='Paid'))(ctx, n * BULK_ROWS)
+    return [ids[i:i + BULK_ROWS] for i in range(0, len(ids), BULK_ROWS)]
+
+
+def _access_tokens(ctx, n):
+    from flask_jwt_extended import create_access_token
+    with ctx.app.app_context():
+        return [create_access_token(identity=2, additional_claims={"user_type": "user"}) for _ in range(n)]
+
+
+def _squad_body(ctx, i, jersey):
+    return {"first_name": "Bench", "last_name": "Player", "position": "Centre", "jersey_number": jersey,
+            "biography": "Benchmark player", "image": "data:image/png;base64,AAAA", "weight": 95, "height": 1.88}
+
+
+def _merchandise_body(ctx, i):
+    return {"name": f"Bench item {i}", "description": "Benchmark", "price": 25, "stock": 100,
+            "image": "https://example.com/item.png", "category": "Jerseys"}
+
+
+def _event_body(ctx, i):
+    return {"name": f"Bench fixture {i}", "description": "Friendly", "date": "2025-06-01 15:00:00",
+            "location": "Legends Rugby Grounds"}
+
+
+def routes():
+    return [
+        # reads
+        Route('home', 'GET', fixed('/')),
+        Route('user_bp.get_all_users', 'GET', fixed('/api/v1/user/users?limit=100')),
+        Route('user_bp.get_user', 'GET', random_id('/api/v1/user/user/{id}', 'users'), auth='user'),
+        Route('squad_bp.get_all_squads', 'GET', fixed('/api/v1/squad/squads'), auth='user'),
+        Route('squad_bp.get_squad', 'GET', random_id('/api/v1/squad/squad/{id}', 'squads'), auth='user'),
+        Route('playerstatistics_bp.get_all_player_statistics', 'GET',
+              fixed('/api/v1/playerstatistics/playerstatistics?limit=100'), auth='user'),
+        Route('playerstatistics_bp.get_player_statistics_by_squad', 'GET',
+              random_id('/api/v1/playerstatistics/squad/{id}', 'squads'), auth='user'),
+        Route('merchandise_bp.get_all_merchandise', 'GET', fixed('/api/v1/merchandise/merchandise?limit=100'), auth='user'),
+        Route('merchandise_bp.get_merchandise', 'GET', random_id('/api/v1/merchandise/merchandise/{id}', 'merchandises'),
+              auth='user'),
+        Route('donation_bp.get_all_donations', 'GET', fixed('/api/v1/donation/?limit=100'), auth='user'),
+        Route('order_bp.get_order_history', 'GET', fixed('/api/v1/orders/history?limit=50'), auth='admin'),
+        Route('contact_bp.get_all_contacts', 'GET', fixed('/api/v1/contacts/?limit=100'), auth='admin'),
+        Route('contact_bp.get_contact', 'GET', random_id('/api/v1/contacts/{id}', 'contacts'), auth='admin'),
+        Route('cache_stats', 'GET', fixed('/api/v1/cache/stats'), auth='admin'),
+        Route('metrics_endpoint', 'GET', fixed('/metrics')),
+
+        # updates
+        Route('user_bp.update_user', 'PUT', random_id('/api/v1/user/edit/{id}', 'users'), auth='admin',
+              body=lambda ctx, i: {"membership_status": "Active"}),
+        Route('squad_bp.update_squad', 'PUT', target('/api/v1/squad/edit/{id}'), auth='admin',
+              prepare=fresh('app.models.squad.Squad', _squad_row),
+              body=lambda ctx, i: _squad_body(ctx, i, f"U{ctx.tag}-{i}")),
+        Route('playerstatistics_bp.update_player_statistics_by_squad', 'PUT',
+              random_id('/api/v1/playerstatistics/edit/squad/{id}', 'squads'), auth='admin',
+              body=lambda ctx, i: {"matches_played": 12}),
+        Route('merchandise_bp.update_merchandise', 'PUT', random_id('/api/v1/merchandise/edit/{id}', 'merchandises'),
+              auth='admin', body=_merchandise_body),
+        Route('donation_bp.update_donation', 'PUT', random_id('/api/v1/donation/edit/{id}', 'donations'), auth='user',
+              body=lambda ctx, i: {"message": "Updated pledge"}),
+        Route('contact_bp.update_contact', 'PUT', random_id('/api/v1/contacts/edit/{id}', 'contacts'), auth='user',
+              body=lambda ctx, i: {"message": "Updated question"}),
+        Route('event_bp.update_event', 'PUT', random_id('/api/v1/event/edit/{id}', 'events'), auth='admin',
+              body=_event_body),
+        Route('order_bp.update_order', 'PUT', target('/api/v1/orders/edit/{id}'), auth='user',
+              prepare=fresh('app.models.order.Order', _user_order_row),
+              body=lambda ctx, i: {"status_of_order": "Paid"}),
+        Route('order_bp.bulk_update_order_status', 'POST', fixed('/api/v1/orders/bulk/status'), auth='admin',
+              requests=20, prepare=_paid_order_batches,
+              body=lambda ctx, i: {"ids": ctx.targets[i], "from": "Paid", "to": "Shipped"}),
+        Route('orderitem_bp.update_order_item', 'PUT', target('/api/v1/orderitem/edit/{id}'), auth='user',
+              prepare=_pending_order_items, body=lambda ctx, i: {"quantity": 2}),
+
+        # creates
+        Route('user_bp.register_user', 'POST', fixed('/api/v1/user/register'), requests=20,
+              body=lambda ctx, i: {"first_name": "New", "last_name": "Member", "contact": f"R{ctx.tag}-{i}",
+                                   "email": f"new{ctx.tag}-{i}@example.com", "password": BENCH_PASSWORD,
+                                   "join_date": "2024-01-01 00:00:00", "membership_status": "Active"}),
+        Route('squad_bp.create_squad', 'POST', fixed('/api/v1/squad/create'), auth='admin',
+              body=lambda ctx, i: _squad_body(ctx, i, f"C{ctx.tag}-{i}")),
+        Route('playerstatistics_bp.create_player_statistic', 'POST', fixed('/api/v1/playerstatistics/create'),
+              auth='admin', body=lambda ctx, i: {"squad_id": ctx.some_id('squads'), "matches_played": 3,
+                                                 "tries_scored": 1, "minutes_played": 240}),
+        Route('merchandise_bp.create_merchandise', 'POST', fixed('/api/v1/merchandise/create'), auth='admin',
+              body=_merchandise_body),
+        Route('donation_bp.create_donation', 'POST', fixed('/api/v1/donation/create'), auth='user',
+              body=lambda ctx, i: {"amount": 50, "name": "Bench donor", "user_id": 2, "description": "Go club"}),
+        Route('contact_bp.create_contact', 'POST', fixed('/api/v1/contacts/create'),
+              body=lambda ctx, i: {"name": "Bench fan", "email": f"fan{ctx.tag}-{i}@example.com",
+                                   "message": "Season tickets?"}),
+        Route('event_bp.create_event', 'POST', fixed('/api/v1/event/create'), auth='admin', body=_event_body),
+        Route('order_bp.create_order', 'POST', fixed('/api/v1/orders/create'), auth='user',
+              body=lambda ctx, i: {"address_of_delivery": "1 Stadium Road"}),
+        Route('order_bp.checkout', 'POST', fixed('/api/v1/orders/checkout'), auth='user',
+              body=lambda ctx, i: {"address_of_delivery": "1 Stadium Road", "items": [
+                  {"merchandise_id": ctx.some_id('merchandises'), "quantity": 1 + n % 3} for n in range(5)]}),
+        Route('orderitem_bp.create_order_item', 'POST', fixed('/api/v1/orderitem/create'), auth='user',
+              prepare=fresh('app.models.order.Order', _user_order_row),
+              body=lambda ctx, i: {"order_id": ctx.targets[i], "merchandise_id": ctx.some_id('merchandises'),
+                                   "quantity": 1}),
+        Route('ticket_bp.create_ticket', 'POST', fixed('/api/v1/ticket/create'), auth='user',
+              body=lambda ctx, i: {"event_id": ctx.some_id('events'), "price": 30, "section": "North",
+                                   "row": "A", "seat": str(i)}),
+
+        # bulk loads, BULK_ROWS rows per request
+        Route('squad_bp.bulk_create_squads', 'POST', fixed('/api/v1/squad/bulk'), auth='admin', requests=20,
+              body=lambda ctx, i: [_squad_body(ctx, i, f"B{ctx.tag}-{i}-{n}") for n in range(BULK_ROWS)]),
+        Route('playerstatistics_bp.bulk_create_player_statistics', 'POST', fixed('/api/v1/playerstatistics/bulk'),
+              auth='admin', requests=20, body=lambda ctx, i: [{"squad_id": ctx.some_id('squads'), "matches_played": 3}
+                                                              for n in range(BULK_ROWS)]),
+        Route('merchandise_bp.bulk_create_merchandise', 'POST', fixed('/api/v1/merchandise/bulk'), auth='admin',
+              requests=20, body=lambda ctx, i: {"mode": "upsert", "items": [_merchandise_body(ctx, n)
+                                                                            for n in range(BULK_ROWS)]}),
+        Route('ticket_bp.bulk_create_tickets', 'POST', fixed('/api/v1/ticket/bulk'), auth='admin', requests=20,
+              body=lambda ctx, i: [{"event_id": ctx.some_id('events'), "price": 30, "section": f"B{ctx.tag}",
+                                    "row": str(i), "seat": str(n)} for n in range(BULK_ROWS)]),
+
+        # deletes, each on rows inserted just for it
+        Route('squad_bp.delete_squad', 'DELETE', target('/api/v1/squad/delete/{id}'), auth='admin',
+              prepare=fresh('app.models.squad.Squad', _squad_row)),
+        Route('playerstatistics_bp.delete_player_statistics_by_squad', 'DELETE',
+              target('/api/v1/playerstatistics/delete/squad/{id}'), auth='admin', prepare=_squads_with_statistics),
+        Route('merchandise_bp.delete_merchandise', 'DELETE', target('/api/v1/merchandise/delete/{id}'), auth='admin',
+              prepare=fresh('app.models.merchandise.Merchandise', lambda ctx, i: {
+                  "name": "Temp", "description": "Temp", "price": 1, "stock": 1, "image": "img", "category": "Caps"})),
+        Route('donation_bp.delete_donation', 'DELETE', target('/api/v1/donation/delete/{id}'), auth='user',
+              prepare=fresh('app.models.donation.Donation', lambda ctx, i: {
+                  "user_id": 2, "amount": 1, "donation_date": datetime(2024, 1, 1), "name": "Temp"})),
+        Route('contact_bp.delete_contact', 'DELETE', target('/api/v1/contacts/delete/{id}'), auth='admin',
+              prepare=fresh('app.models.contact.Contact', lambda ctx, i: {
+                  "name": "Temp", "email": f"temp{ctx.tag}-{i}@example.com", "message": "Temp",
+                  "date": datetime(2024, 1, 1)})),
+        Route('event_bp.delete_event', 'DELETE', target('/api/v1/event/delete/{id}'), auth='admin',
+              prepare=fresh('app.models.event.Event', lambda ctx, i: {
+                  "name": "Temp", "description": "Temp", "date": datetime(2024, 1, 1), "location": "Temp"})),
+        Route('order_bp.delete_order', 'DELETE', target('/api/v1/orders/delete/{id}'), auth='user',
+              prepare=fresh('app.models.order.Order', _user_order_row)),
+        Route('orderitem_bp.delete_order_item', 'DELETE', target('/api/v1/orderitem/delete/{id}'), auth='user',
+              prepare=_pending_order_items),
+        Route('ticket_bp.delete_ticket', 'DELETE', target('/api/v1/ticket/tickets/{id}'), auth='user',
+              prepare=fresh('app.models.ticket.Ticket', lambda ctx, i: {
+                  "event_id": 1, "price": 1, "section": "Temp", "row": "A", "seat": "1"})),
+
+        # session routes, bcrypt bound so fewer iterations
+        Route('user_bp.login_user', 'POST', fixed('/api/v1/user/login'), requests=20,
+              body=lambda ctx, i: {"email": USER_EMAIL, "password": BENCH_PASSWORD}),
+        Route('user_bp.refresh_access_token', 'POST', fixed('/api/v1/user/refresh'), auth='refresh'),
+        Route('user_bp.logout_user', 'POST', fixed('/api/v1/user/logout'), auth=lambda ctx, i: ctx.targets[i],
+              prepare=_access_tokens),
+    ]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def login(client, email):
+    data = client.post('/api/v1/user/login', json={"email": email, "password": BENCH_PASSWORD}).get_json()
+    return data['access_token'], data['refresh_token']
+
+
+def run_route(ctx, route, requests, warmup):
+    n = route.requests and min(route.requests, requests) or requests
+    ctx.targets = route.prepare(ctx, n + warmup) if route.prepare else []
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    for i in range(n + warmup):
+        headers = {}
+        token = route.auth(ctx, i) if callable(route.auth) else ctx.tokens.get(route.auth)
+        if token:
+            headers['Authorization'] = 'Bearer ' + token
+        path = route.path(ctx, i)
+        body = route.body(ctx, i) if route.body else None
+
+        if i == warmup:
+            started = time.perf_counter()
+        t0 = time.perf_counter()
+        response = ctx.client.open(path, method=route.method, json=body, headers=headers)
+        response.close()
+        elapsed = time.perf_counter() - t0
+        if i >= warmup:
+            latencies.append(elapsed)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": n,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(n / total, 1) if total else 0.0,
+        "statuses": statuses
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if current[metric] > previous[metric] * (1 + tolerance) and current[metric] - previous[metric] > min_delta_ms:
+                regressions.append(f"{key}: {metric} {previous[metric]:.2f} -> {current[metric]:.2f} ms")
+        if current['rps'] < previous['rps'] / (1 + tolerance):
+            regressions.append(f"{key}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+        new_errors = sum(v for k, v in current['statuses'].items() if k.startswith('5'))
+        old_errors = sum(v for k, v in previous['statuses'].items() if k.startswith('5'))
+        if new_errors > old_errors:
+            regressions.append(f"{key}: {new_errors} server errors (baseline {old_errors})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='SQLite file (default: a temporary file)')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse an already seeded --db')
+    add_volume_arguments(parser)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', help='substring filter on the route key')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore slowdowns smaller than this')
+    parser.add_argument('--verbose', action='store_true', help='keep the N+1 / slow request log')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger('app.sql').setLevel(logging.ERROR)
+
+    app = make_app(args.db, RESPONSE_CACHE_ENABLED=not args.no_cache)
+    volumes = volumes_from_args(args)
+    if not args.skip_seed:
+        seed(app, volumes, args.batch_size, log=lambda line: print('seed  ' + line))
+
+    from app.extensions import db
+    client = app.test_client()
+    ctx = Context(app, client, random.Random(1), f'{int(time.time())}')
+    with app.app_context():
+        for table in db.metadata.tables.values():
+            ctx.max_id[table.name] = db.session.execute(db.select(db.func.max(table.c.id))).scalar() or 1
+    ctx.tokens['admin'], _ = login(client, ADMIN_EMAIL)
+    ctx.tokens['user'], ctx.tokens['refresh'] = login(client, USER_EMAIL)
+
+    # every blueprint route needs a scenario, so a new route cannot silently go unmeasured
+    all_routes = routes()
+    covered = {(route.endpoint, route.method) for route in all_routes}
+    missing = sorted(
+        f'{method} {rule.endpoint}' for rule in app.url_map.iter_rules() if '.' in rule.endpoint
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS', 'PATCH'}) if (rule.endpoint, method) not in covered
+    )
+    if missing:
+        print('routes without a benchmark scenario:\n  ' + '\n  '.join(missing))
+        sys.exit(2)
+
+    results = {}
+    print(f"{'route':<62} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>9}  statuses")
+    for route in all_routes:
+        if args.only and args.only not in route.key:
+            continue
+        result = results[route.key] = run_route(ctx, route, args.requests, args.warmup)
+        print(f"{route.key:<62} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['rps']:9.1f}  {result['statuses']}")
+
+    meta = {"volumes": volumes, "requests": args.requests, "seeded": not args.skip_seed,
+            "response_cache": not args.no_cache}
+    if args.save_baseline:
+        with open(args.baseline, 'w') as fh:
+            json.dump({"meta": meta, "routes": results}, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save-baseline to record one")
+        return
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    if baseline.get('meta') != meta:
+        print(f"warning: baseline was recorded with {baseline.get('meta')}, this run used {meta}")
+    regressions = compare(results, baseline['routes'], args.tolerance, args.min_delta_ms)
+    if regressions:
+        print('\n' + '!' * 72)
+        print(f"PERFORMANCE REGRESSION: {len(regressions)} check(s) worse than baseline by more than "
+              f"{args.tolerance:.0%}")
+        for line in regressions:
+            print('  ' + line)
+        print('!' * 72)
+        sys.exit(1)
+    print(f"\nno regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Serializing 100k Squad/User rows: the old hand-built dict literals vs the compiled serializers.
+#
+#   python benchmarks/bench_serializers.py --rows 100000
+import argparse
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from common import make_app
+
+
+def squad_dict(squad):
+    date_of_birth_str = squad.date_of_birth.strftime("%Y-%m-%d") if isinstance(squad.date_of_birth, datetime) else squad.date_of_birth
+    return {
+        "id": squad.id,
+        "first_name": squad.first_name,
+        "last_name": squad.last_name,
+        "position": squad.position,
+        "jersey_number": squad.jersey_number,
+        "biography": squad.biography,
+        "image": squad.image,
+        "weight": squad.weight,
+        "height": squad.height,
+        "date_of_birth": date_of_birth_str
+    }
+
+
+def user_dict(user):
+    join_date_str = user.join_date.strftime("%Y-%m-%d") if isinstance(user.join_date, datetime) else user.join_date
+    return {
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "contact": user.contact,
+        "email": user.email,
+        "join_date": join_date_str,
+        "membership_status": user.membership_status,
+        "user_type": user.user_type
+    }
+
+
+def timed(fn, rows):
+    start = time.perf_counter()
+    fn(rows)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    make_app()
+    from app.models.squad import Squad, squad_serializer
+    from app.models.user import User, user_serializer
+
+    squads = []
+    users = []
+    for i in range(args.rows):
+        squad = Squad('First', 'Last', 'Wing', str(i), 'Biography', 'image', Decimal('80.50'), Decimal('1.85'), date(1995, 5, 17))
+        squad.id = i
+        squads.append(squad)
+        user = User('First', 'Last', str(i), f'user{i}@example.com', 'hash', 'Active', 'user', datetime(2024, 1, 1))
+        user.id = i
+        users.append(user)
+
+    print(f"{'model':>6} {'before s':>10} {'after s':>10} {'speedup':>8}")
+    for name, rows, before, serializer in (
+        ('Squad', squads, squad_dict, squad_serializer),
+        ('User', users, user_dict, user_serializer),
+    ):
+        old = timed(lambda objs: [before(obj) for obj in objs], rows)
+        new = timed(serializer.dump_many, rows)
+        print(f"{name:>6} {old:>10.3f} {new:>10.3f} {old / new:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
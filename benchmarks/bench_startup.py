@@ -0,0 +1,91 @@
+# Cold-start cost of the app: time to import it, build it with create_app and serve the
+# first request, each measured in a fresh interpreter. Also prints the slowest imports from
+# `python -X importtime`.
+#
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --runs 10 --top 30
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+status = app.test_client().get('/api/v1/squad/squads').status_code
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "create_app": t2 - t1, "first_request": t3 - t2, "status": status}))
+'''
+
+
+def child_env():
+    env = dict(os.environ)
+    env['APP_ENV'] = 'testing'
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def run_once():
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=child_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# self and cumulative microseconds per module from `-X importtime`
+def import_profile():
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+                         cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True)
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return modules
+
+
+def report_imports(modules, top):
+    total = sum(self_us for _, self_us, _ in modules)
+    print(f'{len(modules)} modules imported, {total / 1000:.0f} ms in total')
+    print(f'{"cumulative ms":>14} {"self ms":>8}  module')
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:top]:
+        print(f'{cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}  {name}')
+
+    by_package = {}
+    for _, self_us, name in modules:
+        package = name.strip().split('.')[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    print(f'\n{"self ms":>8}  top-level package')
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f'{self_us / 1000:8.1f}  {package}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per mode')
+    parser.add_argument('--top', type=int, default=20, help='modules listed in the import profile')
+    parser.add_argument('--no-profile', action='store_true', help='skip the -X importtime report')
+    args = parser.parse_args()
+
+    if not args.no_profile:
+        print('== import profile')
+        report_imports(import_profile(), args.top)
+        print()
+
+    phases = ('import', 'create_app', 'first_request')
+    print(' '.join(f'{phase + " ms":>17}' for phase in phases) + f' {"total ms":>10}')
+    runs = [run_once() for _ in range(args.runs)]
+    medians = {phase: statistics.median(run[phase] for run in runs) * 1000 for phase in phases}
+    print(' '.join(f'{medians[phase]:17.1f}' for phase in phases) + f' {sum(medians.values()):10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# Flash sale: concurrent buyers checking out the same item until it sells out, on a SQLite
+# file database. Checks that exactly the stock was sold (every unit in one order, none twice)
+# and reports checkouts per second. --hot sells the item from the shared-memory counter
+# instead of the row (HOT_MERCHANDISE_IDS), --workers runs the buyers in several processes
+# like gunicorn workers. Afterwards checks that the expiry sweep leaves paid orders' stock sold.
+#
+#   python benchmarks/bench_stock.py --stock 500 --buyers 16
+#   python benchmarks/bench_stock.py --stock 500 --buyers 8 --workers 4 --hot
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import make_app, create_user
+
+BUYER_EMAIL = 'buyer@bench.local'
+BUYER_PASSWORD = 'bench-password'
+
+
+def add_item(app, stock):
+    from app.extensions import db
+    from app.models.merchandise import Merchandise
+
+    with app.app_context():
+        item = Merchandise(name='Launch Jersey', description='Limited run', price=80.0, stock=stock,
+                           image='jersey.png', category='Apparel')
+        db.session.add(item)
+        db.session.commit()
+        return item.id
+
+
+# Each buyer checks out `quantity` units until told the item is sold out
+def run_buyers(app, token, merchandise_id, buyers, quantity):
+    counts = {'placed': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    body = {"address_of_delivery": "1 Stadium Road", "items": [{"merchandise_id": merchandise_id, "quantity": quantity}]}
+    headers = {'Authorization': 'Bearer ' + token}
+
+    def buyer():
+        client = app.test_client()
+        mine = {'placed': 0, 'sold_out': 0, 'errors': 0}
+        while True:
+            status = client.post('/api/v1/orders/checkout', json=body, headers=headers).status_code
+            if status == 201:
+                mine['placed'] += 1
+            elif status == 409:
+                mine['sold_out'] += 1
+                break
+            else:
+                mine['errors'] += 1
+                if mine['errors'] > 100:
+                    break
+        with lock:
+            for key, value in mine.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=buyer) for _ in range(buyers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+# Two orders whose reservations expire at once, one of them paid: the sweep must expire and
+# release only the Pending one, even with a reservation row left on the paid order (as items
+# added after payment used to leave), and cancelling the paid order returns its items once
+def check_expiry(app, token):
+    from datetime import datetime
+    from app.extensions import db
+    from app.models.merchandise import Merchandise
+    from app.models.order import Order
+    from app.models.reservation import StockReservation
+    from app.reservations import stock_reservations
+
+    merchandise_id = add_item(app, 10)
+    client = app.test_client()
+    headers = {'Authorization': 'Bearer ' + token}
+
+    def place(quantity):
+        body = {"address_of_delivery": "1 Stadium Road", "items": [{"merchandise_id": merchandise_id, "quantity": quantity}]}
+        return client.post('/api/v1/orders/checkout', json=body, headers=headers).get_json()['order']['id']
+
+    def state():
+        with app.app_context():
+            stock = db.session.get(Merchandise, merchandise_id).stock
+            statuses = dict(db.session.execute(db.select(Order.id, Order.status_of_order)
+                                               .where(Order.id.in_([paid, pending]))).all())
+        return stock, statuses
+
+    ttl, stock_reservations.ttl = stock_reservations.ttl, 0
+    try:
+        paid, pending = place(3), place(4)
+    finally:
+        stock_reservations.ttl = ttl
+    failures = []
+    status = client.put(f'/api/v1/orders/edit/{paid}', json={"status_of_order": "Paid"}, headers=headers).status_code
+    if status != 200:
+        failures.append(f'paying an order: status {status}, expected 200')
+    with app.app_context():
+        db.session.add(StockReservation(paid, merchandise_id, 3, datetime.utcnow()))
+        db.session.commit()
+        stock_reservations.release_expired()
+    stock, statuses = state()
+    if stock != 7 or statuses != {paid: 'Paid', pending: 'Expired'}:
+        failures.append(f'after the expiry sweep: stock {stock}, orders {statuses}, '
+                        f'expected 7 and the paid order untouched')
+    status = client.put(f'/api/v1/orders/edit/{paid}', json={"status_of_order": "Cancelled"}, headers=headers).status_code
+    stock, statuses = state()
+    if status != 200 or stock != 10:
+        failures.append(f'cancelling the paid order: status {status}, stock {stock}, expected 200 and 10')
+    return failures
+
+
+def worker(app, token, merchandise_id, buyers, quantity, results):
+    from app.extensions import db
+
+    # connections inherited from the parent must not be shared
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    results.put(run_buyers(app, token, merchandise_id, buyers, quantity))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--buyers', type=int, default=16, help='concurrent buyers (threads) per process')
+    parser.add_argument('--workers', type=int, default=1, help='processes, each with --buyers threads')
+    parser.add_argument('--quantity', type=int, default=1, help='units per checkout')
+    parser.add_argument('--hot', action='store_true', help='sell from the shared-memory hot-item counter')
+    parser.add_argument('--lease', type=int, default=50, help='HOT_STOCK_LEASE')
+    args = parser.parse_args()
+
+    logging.getLogger('app.sql').setLevel(logging.ERROR)
+    workdir = tempfile.mkdtemp(prefix='bench_stock-')
+    db_path = os.path.join(workdir, 'stock.db')
+    # create_app needs the hot id before the item exists: it is the first merchandise row
+    app = make_app(db_path, RESPONSE_CACHE_ENABLED=False, BCRYPT_LOG_ROUNDS=4,
+                   HOT_MERCHANDISE_IDS=[1] if args.hot else [], HOT_STOCK_LEASE=args.lease, HOT_STOCK_DIR=workdir)
+    merchandise_id = add_item(app, args.stock)
+    create_user(app, BUYER_EMAIL, BUYER_PASSWORD)
+    token = app.test_client().post('/api/v1/user/login', json={"email": BUYER_EMAIL, "password": BUYER_PASSWORD}).get_json()['access_token']
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(app, token, merchandise_id, args.buyers, args.quantity, results))
+                     for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        counts = {'placed': 0, 'sold_out': 0, 'errors': 0}
+        for _ in processes:
+            for key, value in results.get().items():
+                counts[key] += value
+        for process in processes:
+            process.join()
+    else:
+        counts = run_buyers(app, token, merchandise_id, args.buyers, args.quantity)
+    elapsed = time.perf_counter() - start
+
+    from app.extensions import db
+    from app.models.merchandise import Merchandise
+    from app.models.orderitem import OrderItem
+    from app.models.reservation import StockReservation
+    from app.reservations import stock_reservations
+
+    with app.app_context():
+        leased = stock_reservations.hot.flush() if args.hot else 0
+        stock = db.session.get(Merchandise, merchandise_id).stock
+        sold = db.session.execute(db.select(db.func.coalesce(db.func.sum(OrderItem.quantity), 0))
+                                  .where(OrderItem.merchandise_id == merchandise_id)).scalar()
+        reserved = db.session.execute(db.select(db.func.coalesce(db.func.sum(StockReservation.quantity), 0))
+                                      .where(StockReservation.merchandise_id == merchandise_id)).scalar()
+
+    buyers = args.buyers * args.workers
+    print(f'{buyers} buyers ({args.workers} process(es)), stock {args.stock}, {args.quantity} per checkout'
+          f'{", hot counter" if args.hot else ""}')
+    print(f'placed {counts["placed"]} orders, {counts["sold_out"]} sold-out answers, {counts["errors"]} errors'
+          f' in {elapsed:.2f} s: {counts["placed"] / elapsed:.1f} checkouts/s')
+    print(f'units sold {sold}, reserved {reserved}, left in stock {stock}'
+          f'{f" ({leased} returned from the hot counter)" if args.hot else ""}')
+
+    oversold = sold > args.stock or stock < 0 or sold + stock != args.stock or reserved != sold \
+        or sold != counts['placed'] * args.quantity
+    unsold = stock >= args.quantity
+    if oversold:
+        print('OVERSOLD: sold units and stock do not add up')
+        sys.exit(1)
+    if unsold:
+        print('item did not sell out')
+        sys.exit(1)
+    failures = check_expiry(app, token)
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+    print('ok: no overselling, paid orders keep their stock through the expiry sweep')
+
+
+if __name__ == '__main__':
+    main()
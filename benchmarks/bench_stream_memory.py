@@ -0,0 +1,57 @@
+# Peak Python memory of a full /api/v1/donation/ export, paginated list vs streamed.
+# The streamed peak should stay flat as --rows grows.
+#
+#   python benchmarks/bench_stream_memory.py --rows 10000,100000
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from common import make_app
+
+
+def seed(app, rows):
+    from app.extensions import db
+    from app.models.donation import Donation
+
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.execute(db.insert(Donation), [
+            {"user_id": 1, "amount": 10.0, "donation_date": now, "message": "Up the club", "name": f"Donor {i}", "contact": "0700000000"}
+            for i in range(rows)
+        ])
+        db.session.commit()
+
+
+def peak(app, url, headers=None):
+    client = app.test_client()
+    tracemalloc.start()
+    response = client.get(url, headers=headers, buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_bytes, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', default='10000,50000')
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'mode':>8} {'peak MiB':>10} {'body MiB':>10}")
+    for rows in (int(r) for r in args.rows.split(',')):
+        app = make_app(PAGINATION_MAX_LIMIT=rows)
+        seed(app, rows)
+        for mode, url, headers in (
+            ('list', f'/api/v1/donation/?limit={rows}', None),
+            ('ndjson', '/api/v1/donation/', {'Accept': 'application/x-ndjson'}),
+            ('chunked', '/api/v1/donation/?stream=1', None),
+        ):
+            peak_bytes, size = peak(app, url, headers)
+            print(f"{rows:>8} {mode:>8} {peak_bytes / 2**20:>10.2f} {size / 2**20:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
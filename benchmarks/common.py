@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Build the app against a throwaway SQLite database (or the given SQLite path / database URL)
+# with the given config overrides
+def make_app(db_path=None, **overrides):
+    import config
+    from app import create_app
+    from app.extensions import db
+
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+    if '://' in db_path:
+        config.config.SQLALCHEMY_DATABASE_URI = db_path
+    else:
+        config.config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        config.config.SQLITE_PRAGMAS = config.SQLiteConfig.SQLITE_PRAGMAS
+    # tokens carry the integer user id as `sub`, which newer flask_jwt_extended rejects by default
+    config.config.JWT_VERIFY_SUB = False
+    for key, value in overrides.items():
+        setattr(config.config, key, value)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def create_user(app, email, password, user_type='user', contact=None):
+    from datetime import datetime
+    from app.extensions import db, bcrypt
+    from app.models.user import User
+
+    with app.app_context():
+        user = User(
+            first_name='Bench',
+            last_name='User',
+            contact=contact or email,
+            email=email,
+            password=bcrypt.generate_password_hash(password).decode('utf-8'),
+            membership_status='Active',
+            user_type=user_type,
+            join_date=datetime.utcnow()
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user.id
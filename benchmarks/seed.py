@@ -0,0 +1,203 @@
+# Synthetic dataset for the route benchmarks. Every model in app/models gets rows, written
+# with executemany in fixed-size batches so memory stays flat at any volume.
+#
+#   python benchmarks/seed.py --db /tmp/recess-large.db --preset large
+#   python benchmarks/seed.py --db /tmp/recess.db --users 50000 --order-items 200000
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from common import make_app
+
+BENCH_PASSWORD = 'benchpassword'
+ADMIN_EMAIL = 'bench-admin@example.com'
+USER_EMAIL = 'bench-user@example.com'
+
+PRESETS = {
+    "small": {
+        "users": 10000, "squads": 60, "stats_per_squad": 5, "merchandise": 200,
+        "orders": 10000, "order_items": 50000, "events": 5, "tickets_per_event": 2000,
+        "donations": 5000, "contacts": 2000
+    },
+    "large": {
+        "users": 1000000, "squads": 500, "stats_per_squad": 20, "merchandise": 5000,
+        "orders": 1000000, "order_items": 5000000, "events": 50, "tickets_per_event": 100000,
+        "donations": 500000, "contacts": 200000
+    }
+}
+
+START = datetime(2020, 1, 1)
+STATUSES = ('Pending', 'Paid', 'Shipped', 'Delivered', 'Cancelled')
+POSITIONS = ('Prop', 'Hooker', 'Lock', 'Flanker', 'Number 8', 'Scrum-half', 'Fly-half', 'Centre', 'Wing', 'Fullback')
+CATEGORIES = ('Jerseys', 'Shorts', 'Caps', 'Scarves', 'Balls', 'Accessories')
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def user_rows(count, password):
+    # ids 1 and 2 are the benchmark admin and regular user
+    yield {"first_name": "Bench", "last_name": "Admin", "contact": "0700000001", "email": ADMIN_EMAIL,
+           "password": password, "join_date": START, "membership_status": "Active", "user_type": "admin"}
+    yield {"first_name": "Bench", "last_name": "User", "contact": "0700000002", "email": USER_EMAIL,
+           "password": password, "join_date": START, "membership_status": "Active", "user_type": "user"}
+    for i in range(3, count + 1):
+        yield {"first_name": f"First{i}", "last_name": f"Last{i}", "contact": f"07{i:09d}",
+               "email": f"user{i}@example.com", "password": password,
+               "join_date": START + timedelta(minutes=i), "membership_status": "Active", "user_type": "user"}
+
+
+def squad_rows(count):
+    for i in range(1, count + 1):
+        yield {"first_name": f"Player{i}", "last_name": f"Surname{i}", "position": POSITIONS[i % len(POSITIONS)],
+               "jersey_number": str(i), "biography": "Academy graduate, club captain material. " * 4,
+               "image": "data:image/png;base64," + "A" * 512, "weight": 80 + i % 40, "height": 1.7 + (i % 30) / 100,
+               "date_of_birth": date(1990 + i % 15, 1 + i % 12, 1 + i % 28)}
+
+
+def player_statistic_rows(squads, per_squad, rng):
+    for squad_id in range(1, squads + 1):
+        for _ in range(per_squad):
+            yield {"squad_id": squad_id, "matches_played": rng.randint(1, 30), "tries_scored": rng.randint(0, 15),
+                   "conversions": rng.randint(0, 20), "penalties": rng.randint(0, 20),
+                   "yellow_cards": rng.randint(0, 3), "red_cards": rng.randint(0, 1),
+                   "minutes_played": rng.randint(80, 2400)}
+
+
+def merchandise_rows(count):
+    for i in range(1, count + 1):
+        yield {"name": f"Item {i}", "description": "Official club merchandise", "price": 5 + i % 95,
+               "stock": 1000, "image": f"https://example.com/merch/{i}.png", "category": CATEGORIES[i % len(CATEGORIES)]}
+
+
+def order_rows(count, users, rng):
+    for i in range(1, count + 1):
+        yield {"user_id": rng.randint(1, users), "order_date": START + timedelta(minutes=i),
+               "status_of_order": STATUSES[i % len(STATUSES)], "address_of_delivery": f"{i} Stadium Road, Kampala"}
+
+
+def order_item_rows(count, orders, merchandise, rng):
+    for i in range(count):
+        quantity = rng.randint(1, 5)
+        price = float(5 + rng.randint(0, 94))
+        yield {"order_id": i % orders + 1, "merchandise_id": rng.randint(1, merchandise), "quantity": quantity,
+               "price_of_item": price, "total_amount": quantity * price}
+
+
+def event_rows(count):
+    for i in range(1, count + 1):
+        yield {"name": f"Fixture {i}", "description": "League match", "date": START + timedelta(days=7 * i),
+               "location": "Kyadondo Rugby Grounds"}
+
+
+def ticket_rows(events, per_event):
+    for event_id in range(1, events + 1):
+        for i in range(per_event):
+            yield {"event_id": event_id, "price": 20.0 + i % 3 * 10, "section": f"S{i % 20}",
+                   "row": str(i // 50 % 100), "seat": str(i % 50)}
+
+
+def donation_rows(count, users, rng):
+    for i in range(1, count + 1):
+        yield {"user_id": rng.randint(1, users), "amount": float(rng.randint(1, 500)),
+               "donation_date": START + timedelta(minutes=i), "message": "Up the club", "name": f"Donor {i}",
+               "contact": f"07{i:09d}"}
+
+
+def contact_rows(count, users):
+    for i in range(1, count + 1):
+        yield {"name": f"Fan {i}", "email": f"fan{i}@example.com", "message": "When is the next home game?",
+               "date": START + timedelta(minutes=i), "user_id": i % users + 1 if i % 2 else None}
+
+
+def seed(app, volumes, batch_size=10000, seed_value=0, log=print):
+    from app.extensions import db, bcrypt
+    from app.models.contact import Contact
+    from app.models.donation import Donation
+    from app.models.event import Event
+    from app.models.merchandise import Merchandise
+    from app.models.order import Order, recalculate_order_totals
+    from app.models.orderitem import OrderItem
+    from app.models.playerstatistics import PlayerStatistic
+    from app.models.squad import Squad
+    from app.models.ticket import Ticket
+    from app.models.user import User
+
+    rng = random.Random(seed_value)
+    v = volumes
+    with app.app_context():
+        # every generated user shares one hash, bcrypt per row would dominate the run
+        password = bcrypt.generate_password_hash(BENCH_PASSWORD).decode('utf-8')
+        plan = [
+            (User, user_rows(max(v["users"], 2), password)),
+            (Squad, squad_rows(v["squads"])),
+            (PlayerStatistic, player_statistic_rows(v["squads"], v["stats_per_squad"], rng)),
+            (Merchandise, merchandise_rows(v["merchandise"])),
+            (Order, order_rows(v["orders"], max(v["users"], 2), rng)),
+            (OrderItem, order_item_rows(v["order_items"], v["orders"], v["merchandise"], rng)),
+            (Event, event_rows(v["events"])),
+            (Ticket, ticket_rows(v["events"], v["tickets_per_event"])),
+            (Donation, donation_rows(v["donations"], max(v["users"], 2), rng)),
+            (Contact, contact_rows(v["contacts"], max(v["users"], 2)))
+        ]
+
+        engine = db.engine
+        with engine.begin() as conn:
+            if engine.dialect.name == 'sqlite':
+                conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+                conn.exec_driver_sql('PRAGMA synchronous=OFF')
+
+        for model, rows in plan:
+            started = time.perf_counter()
+            total = 0
+            insert = model.__table__.insert()
+            for batch in batched(rows, batch_size):
+                with engine.begin() as conn:
+                    conn.execute(insert, batch)
+                total += len(batch)
+            log(f"{model.__tablename__:<18} {total:>10} rows  {time.perf_counter() - started:7.1f}s")
+
+        # the orders' denormalized totals, from the items just inserted
+        started = time.perf_counter()
+        for low in range(0, v["orders"], batch_size):
+            with engine.begin() as conn:
+                conn.execute(recalculate_order_totals(low, low + batch_size))
+        log(f"{'order totals':<18} {v['orders']:>10} rows  {time.perf_counter() - started:7.1f}s")
+
+
+def volumes_from_args(args):
+    volumes = dict(PRESETS[args.preset])
+    for key in volumes:
+        value = getattr(args, key)
+        if value is not None:
+            volumes[key] = value
+    return volumes
+
+
+def add_volume_arguments(parser):
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    for key in PRESETS['small']:
+        parser.add_argument('--' + key.replace('_', '-'), dest=key, type=int)
+    parser.add_argument('--batch-size', type=int, default=10000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', required=True, help='SQLite file to create and fill')
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    app = make_app(args.db)
+    seed(app, volumes_from_args(args), args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
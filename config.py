@@ -1,3 +1,134 @@
+import os
+from datetime import timedelta
+
+
+def env_int(name, default):
+   return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+   return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+# pool settings for MySQL; recycle stays below the server's wait_timeout so idle
+# connections are replaced before MySQL drops them, pre-ping catches the rest
+def mysql_engine_options(pool_size=10, max_overflow=20):
+   return {
+      'pool_size': env_int('DB_POOL_SIZE', pool_size),
+      'max_overflow': env_int('DB_MAX_OVERFLOW', max_overflow),
+      'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),
+      'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+      'pool_timeout': env_int('DB_POOL_TIMEOUT', 30)
+   }
+
+
+# driver timeouts, only passed to engines whose URL is mysql/mariadb (app/database.py),
+# other drivers reject them
+def mysql_connect_args():
+   return {
+      'connect_timeout': env_int('DB_CONNECT_TIMEOUT', 10),
+      'read_timeout': env_int('DB_READ_TIMEOUT', 30),
+      'write_timeout': env_int('DB_WRITE_TIMEOUT', 30)
+   }
+
+
 class config:
-   SQLALCHEMY_DATABASE_URI='mysql+pymysql://root:@localhost/clubApi'
-   JWT_SECRET_KEY='RUGBY API'
\ No newline at end of file
+   SQLALCHEMY_DATABASE_URI=os.environ.get('DATABASE_URL', 'mysql+pymysql://root:@localhost/clubApi')
+   SQLALCHEMY_ENGINE_OPTIONS=mysql_engine_options()
+   MYSQL_CONNECT_ARGS=mysql_connect_args()
+   # comma separated replica URLs; GET requests read from them when set
+   SQLALCHEMY_REPLICA_URIS=[uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+   REPLICA_SELECTION=os.environ.get('REPLICA_SELECTION', 'round_robin')
+   REPLICA_PIN_SECONDS=5
+   POOL_WAIT_THRESHOLD_MS=1
+   JWT_SECRET_KEY='RUGBY API'
+   JWT_ACCESS_TOKEN_EXPIRES=timedelta(minutes=15)
+   JWT_REFRESH_TOKEN_EXPIRES=timedelta(days=30)
+   USER_CACHE_TTL=60
+   # revoked tokens, shared by the worker processes on one host (app/blocklist.py)
+   TOKEN_BLOCKLIST_DIR=None
+   PAGINATION_DEFAULT_LIMIT=100
+   PAGINATION_MAX_LIMIT=1000
+   STREAM_BATCH_SIZE=1000
+   # Per-table version counters behind the ETags / 304s, the response cache and the role claim's
+   # users_version (app/versioning.py), in a shared-memory file. SINGLE HOST ONLY: the worker
+   # processes of one host share them, but a write served by another host doesn't bump them, so
+   # with several API hosts this one keeps answering 304s and cached bodies for stale data, and
+   # trusts an admin claim for up to JWT_ACCESS_TOKEN_EXPIRES after a demotion elsewhere.
+   TABLE_VERSIONS_DIR=None
+   RESPONSE_CACHE_ENABLED=True
+   RESPONSE_CACHE_TTL=300
+   RESPONSE_CACHE_MAX_BYTES=32*1024*1024
+   # gzip (or brotli, when installed) for bodies of at least COMPRESS_MIN_SIZE bytes
+   COMPRESS_ENABLED=True
+   COMPRESS_MIN_SIZE=1024
+   COMPRESS_GZIP_LEVEL=6
+   COMPRESS_BROTLI_QUALITY=4
+   SLOW_REQUEST_MS=500
+   N_PLUS_ONE_THRESHOLD=5
+   # Server-Timing header with each request's SQL count and DB time (app/instrumentation.py);
+   # None follows DEBUG, SQL_SERVER_TIMING=1 or 0 in the environment forces it on or off
+   SQL_SERVER_TIMING=env_bool('SQL_SERVER_TIMING', False) if 'SQL_SERVER_TIMING' in os.environ else None
+   BATCH_MAX_REQUESTS=20
+   BULK_MAX_ROWS=10000
+   CHECKOUT_MAX_ITEMS=100
+   # admin bulk order status changes: ids per call, ids per UPDATE
+   ORDER_STATUS_MAX_IDS=50000
+   ORDER_STATUS_CHUNK=1000
+   # unpaid orders give their reserved stock back after this many seconds (app/reservations.py)
+   RESERVATION_TTL=900
+   # merchandise ids sold from shared-memory counters leased from the stock in blocks
+   HOT_MERCHANDISE_IDS=[int(i) for i in os.environ.get('HOT_MERCHANDISE_IDS', '').split(',') if i.strip()]
+   HOT_STOCK_LEASE=50
+   HOT_STOCK_DIR=None
+   METRICS_DIR=None
+   METRICS_FLUSH_INTERVAL=1.0
+   BCRYPT_LOG_ROUNDS=12
+   BCRYPT_POOL_SIZE=2
+   BCRYPT_QUEUE_SIZE=16
+
+
+class DevelopmentConfig(config):
+   DEBUG=True
+   SQLALCHEMY_ENGINE_OPTIONS=mysql_engine_options(pool_size=5, max_overflow=5)
+
+
+class ProductionConfig(config):
+   SQLALCHEMY_ENGINE_OPTIONS=mysql_engine_options(pool_size=20, max_overflow=30)
+
+
+class TestingConfig(config):
+   TESTING=True
+   SQLALCHEMY_DATABASE_URI='sqlite://'
+   SQLALCHEMY_ENGINE_OPTIONS={}
+   BCRYPT_LOG_ROUNDS=4
+   RESPONSE_CACHE_ENABLED=False
+
+
+# Single-file SQLite for local and edge deployments. WAL lets readers run alongside the
+# one writer, busy_timeout makes writers queue instead of failing with "database is locked".
+class SQLiteConfig(config):
+   SQLALCHEMY_DATABASE_URI=os.environ.get('DATABASE_URL', 'sqlite:///recess.db')
+   SQLALCHEMY_ENGINE_OPTIONS={
+      'pool_size': env_int('DB_POOL_SIZE', 5),
+      'max_overflow': env_int('DB_MAX_OVERFLOW', 10),
+      'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+      'connect_args': {'timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}
+   }
+   SQLITE_PRAGMAS={
+      'journal_mode': 'WAL',
+      'synchronous': 'NORMAL',
+      'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+      'cache_size': -env_int('SQLITE_CACHE_KB', 64000),
+      'temp_store': 'MEMORY',
+      'mmap_size': env_int('SQLITE_MMAP_BYTES', 256 * 1024 * 1024)
+   }
+
+
+configs={
+   'default': config,
+   'development': DevelopmentConfig,
+   'production': ProductionConfig,
+   'testing': TestingConfig,
+   'sqlite': SQLiteConfig
+}
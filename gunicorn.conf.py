@@ -0,0 +1,78 @@
+# Production server settings, read by gunicorn from the working directory:
+#
+#   gunicorn wsgi:app
+#   RECESS_WORKER_CLASS=gevent WEB_CONCURRENCY=4 gunicorn wsgi:app
+#
+# The app is built once in the master (preload_app) and forked, so the model and
+# blueprint imports are shared copy-on-write. Each worker then drops the connection
+# pools it inherited and opens its own.
+import multiprocessing
+import os
+import time
+
+bind = os.environ.get('RECESS_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# gthread (default), sync or gevent; gevent needs the gevent package installed
+worker_class = os.environ.get('RECESS_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('RECESS_THREADS', 4))
+worker_connections = int(os.environ.get('RECESS_WORKER_CONNECTIONS', 200))
+preload_app = True
+
+timeout = int(os.environ.get('RECESS_TIMEOUT', 60))
+# in-flight requests get this long to finish after SIGTERM
+graceful_timeout = int(os.environ.get('RECESS_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# recycle workers now and then so slow leaks can't build up
+max_requests = int(os.environ.get('RECESS_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('RECESS_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.environ.get('RECESS_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('RECESS_LOG_LEVEL', 'info')
+
+_started = time.perf_counter()
+
+
+def _dispose_engines(close):
+    import wsgi
+    from app.extensions import db
+
+    with wsgi.app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+# counters restart from zero with the server
+def on_starting(server):
+    from app.metrics import metrics
+    metrics.clear()
+
+
+def when_ready(server):
+    import wsgi
+    server.log.info('app loaded in %.0f ms, server ready %.0f ms after start',
+                    wsgi.startup_seconds * 1000, (time.perf_counter() - _started) * 1000)
+
+
+def pre_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+# Connections opened in the master must not be shared with the children: forget them
+# without closing (close=False), the master still owns the sockets.
+def post_fork(server, worker):
+    _dispose_engines(close=False)
+
+
+def post_worker_init(worker):
+    worker.log.info('worker %s ready in %.0f ms after fork', worker.pid,
+                    (time.perf_counter() - worker.forked_at) * 1000)
+
+
+def worker_exit(server, worker):
+    from app.extensions import bcrypt
+    from app.metrics import metrics
+
+    metrics.flush()
+    bcrypt.shutdown()
+    _dispose_engines(close=True)
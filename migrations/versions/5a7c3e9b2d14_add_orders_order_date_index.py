@@ -0,0 +1,24 @@
+"""Add orders order_date index.
+
+Revision ID: 5a7c3e9b2d14
+Revises: 9d2e4f7a1b86
+Create Date: 2026-10-18 17:40:52.118306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c3e9b2d14'
+down_revision = '9d2e4f7a1b86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_orders_order_date', 'orders', ['order_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_orders_order_date', table_name='orders')
@@ -0,0 +1,56 @@
+"""Add foreign key and filter indexes.
+
+Revision ID: 7c41e9a2b5d3
+Revises: de1d6128873c
+Create Date: 2026-10-18 10:12:41.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41e9a2b5d3'
+down_revision = 'de1d6128873c'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns); keep in step with the __table_args__ of the models
+INDEXES = [
+    ('ix_orders_user_id_order_date', 'orders', ['user_id', 'order_date']),
+    ('ix_order_items_order_id_merchandise_id', 'order_items', ['order_id', 'merchandise_id']),
+    ('ix_order_items_merchandise_id', 'order_items', ['merchandise_id']),
+    ('ix_playerstatistics_squad_id', 'playerstatistics', ['squad_id']),
+    ('ix_tickets_event_id_section_row_seat', 'tickets', ['event_id', 'section', 'row', 'seat']),
+    ('ix_donations_user_id_donation_date', 'donations', ['user_id', 'donation_date']),
+    ('ix_donations_donation_date', 'donations', ['donation_date']),
+    ('ix_contacts_date', 'contacts', ['date']),
+    ('ix_events_date', 'events', ['date']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for name, table, columns in reversed(INDEXES):
+        if bind.dialect.name in ('mysql', 'mariadb'):
+            # InnoDB drops the index it made for a foreign key once another index covers the
+            # column, so dropping ours would leave the key unindexed (error 1553). Put back a
+            # plain index, named after the constraint as InnoDB names it, first.
+            inspector = sa.inspect(bind)
+            for foreign_key in inspector.get_foreign_keys(table):
+                fk_columns = foreign_key['constrained_columns']
+                if fk_columns == columns[:len(fk_columns)] and not _covered(inspector, table, fk_columns, name):
+                    op.create_index(foreign_key['name'], table, fk_columns, unique=False)
+        op.drop_index(name, table_name=table)
+
+
+# Whether an index other than `skip` (or the primary key) starts with `columns`
+def _covered(inspector, table, columns, skip):
+    candidates = [index['column_names'] for index in inspector.get_indexes(table) if index['name'] != skip]
+    candidates.append(inspector.get_pk_constraint(table)['constrained_columns'])
+    return any(candidate[:len(columns)] == columns for candidate in candidates)
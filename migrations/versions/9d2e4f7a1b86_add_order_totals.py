@@ -0,0 +1,49 @@
+"""Add order totals.
+
+Revision ID: 9d2e4f7a1b86
+Revises: 3f8b6d1c9a47
+Create Date: 2026-10-18 16:21:09.734511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e4f7a1b86'
+down_revision = '3f8b6d1c9a47'
+branch_labels = None
+depends_on = None
+
+# orders per backfill statement, each committed on its own so a large table is never
+# locked for the whole run
+BATCH_SIZE = 5000
+
+orders = sa.table('orders', sa.column('id', sa.Integer), sa.column('order_total', sa.Float),
+                  sa.column('item_count', sa.Integer))
+order_items = sa.table('order_items', sa.column('order_id', sa.Integer), sa.column('quantity', sa.Integer),
+                       sa.column('total_amount', sa.Float))
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('order_total', sa.Float(), server_default='0', nullable=False))
+    op.add_column('orders', sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+
+    items = sa.select(order_items).where(order_items.c.order_id == orders.c.id)
+    order_total = items.with_only_columns(
+        sa.func.coalesce(sa.func.round(sa.func.sum(order_items.c.total_amount), 2), 0)).scalar_subquery()
+    item_count = items.with_only_columns(sa.func.coalesce(sa.func.sum(order_items.c.quantity), 0)).scalar_subquery()
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = connection.execute(sa.select(sa.func.max(orders.c.id))).scalar() or 0
+        for low in range(0, last_id, BATCH_SIZE):
+            connection.execute(
+                orders.update().where(orders.c.id > low, orders.c.id <= low + BATCH_SIZE)
+                .values(order_total=order_total, item_count=item_count)
+            )
+
+
+def downgrade():
+    op.drop_column('orders', 'item_count')
+    op.drop_column('orders', 'order_total')
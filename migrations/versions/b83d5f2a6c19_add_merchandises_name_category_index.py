@@ -0,0 +1,24 @@
+"""Add merchandises name category index.
+
+Revision ID: b83d5f2a6c19
+Revises: 5a7c3e9b2d14
+Create Date: 2026-10-18 21:05:17.530442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83d5f2a6c19'
+down_revision = '5a7c3e9b2d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_merchandises_name_category', 'merchandises', ['name', 'category'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_merchandises_name_category', table_name='merchandises')
@@ -0,0 +1,10 @@
+import time
+
+_started = time.perf_counter()
+
+from app import create_app
+
+app = create_app()
+
+# import + create_app, reported by gunicorn once the server is ready
+startup_seconds = time.perf_counter() - _started